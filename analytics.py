@@ -0,0 +1,208 @@
+# analytics.py
+"""
+Teacher analytics over quiz attempts and assessment results.
+
+Every result is rolled up into performance_rollup in the same transaction that stores it:
+one row per day, source ('quiz' or 'assessment'), topic, class level and 10-point score bin,
+holding the number of attempts, how many passed and the sum of their score percentages.
+The dashboard only reads these rollups and reduces them with NumPy, so its cost depends on
+the number of groups and days shown, not on the number of attempts.
+"""
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import Blueprint, render_template, request
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from auth import admin_required
+from extensions import db
+from models import Quiz, QuizAttempt, AssessmentResult, PerformanceRollup
+
+analytics = Blueprint('analytics', __name__)
+
+BINS = 10 # Score histogram bins of 10 percentage points
+ASSESSMENT_TOPIC = 'Assessment' # Assessments cover a whole class syllabus rather than one topic
+ASSESSMENT_PASS_PERCENT = 33 # Board-exam pass mark, used for assessments (quizzes have their own pass_mark)
+REBUILD_CHUNK = 10000 # Rows per partition when rebuilding from the raw tables
+MAX_DAYS = 365
+
+ROLLUP_KEY = ('day', 'source', 'topic', 'class_level', 'score_bin')
+
+# One row of the breakdown table, and one day of the trend
+GroupSummary = namedtuple('GroupSummary', 'source topic class_level attempts pass_rate mean_score histogram')
+DaySummary = namedtuple('DaySummary', 'day attempts pass_rate mean_score')
+
+
+def score_bins(percentages):
+    """Histogram bin for each score percentage; 100% falls into the top bin."""
+    bins = np.asarray(percentages, dtype=float) // (100 / BINS)
+    return np.clip(bins, 0, BINS - 1).astype(int)
+
+
+def _percentages(scores, totals):
+    scores = np.asarray(scores, dtype=float)
+    totals = np.asarray(totals, dtype=float)
+    return np.divide(scores * 100, totals, out=np.zeros_like(scores), where=totals > 0)
+
+
+def _group_index(keys):
+    """Numbers distinct keys in order of appearance; returns (distinct keys, index per key)."""
+    positions = {}
+    index = np.fromiter((positions.setdefault(key, len(positions)) for key in keys), dtype=int)
+    return list(positions), index
+
+
+def rollup_rows(source, days, topics, class_levels, percentages, passed):
+    """Aggregates parallel sequences of results into performance_rollup rows (dicts)."""
+    percentages = np.asarray(percentages, dtype=float)
+    bins = score_bins(percentages)
+    groups, index = _group_index(zip(days, topics, class_levels, bins.tolist()))
+    attempts = np.bincount(index, minlength=len(groups))
+    passed_counts = np.bincount(index, weights=np.asarray(passed, dtype=float), minlength=len(groups))
+    pct_sums = np.bincount(index, weights=percentages, minlength=len(groups))
+    return [
+        dict(day=day, source=source, topic=topic, class_level=class_level, score_bin=score_bin,
+             attempts=int(attempts[i]), passed=int(passed_counts[i]), score_pct_sum=float(pct_sums[i]))
+        for i, (day, topic, class_level, score_bin) in enumerate(groups)
+    ]
+
+
+def _add_rollups(rows):
+    """Adds rollup rows onto the stored ones with one executemany upsert, in the caller's transaction."""
+    if not rows:
+        return
+    stmt = sqlite_insert(PerformanceRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(ROLLUP_KEY),
+        set_={
+            'attempts': PerformanceRollup.attempts + stmt.excluded.attempts,
+            'passed': PerformanceRollup.passed + stmt.excluded.passed,
+            'score_pct_sum': PerformanceRollup.score_pct_sum + stmt.excluded.score_pct_sum,
+        },
+    )
+    db.session.execute(stmt, rows)
+
+
+def record_quiz_attempt(attempt, quiz):
+    """Rolls up a new QuizAttempt; `quiz` only needs topic and class_level. The caller commits."""
+    day = (attempt.attempted_at or datetime.utcnow()).date()
+    _add_rollups(rollup_rows('quiz', [day], [quiz.topic], [quiz.class_level],
+                             _percentages([attempt.score], [attempt.total_questions]), [attempt.passed]))
+
+
+def record_assessment_result(result):
+    """Rolls up a new AssessmentResult. The caller commits."""
+    day = (result.submitted_at or datetime.utcnow()).date()
+    percentages = _percentages([result.score], [result.total_questions])
+    _add_rollups(rollup_rows('assessment', [day], [ASSESSMENT_TOPIC], [result.class_level],
+                             percentages, percentages >= ASSESSMENT_PASS_PERCENT))
+
+
+def rebuild_rollups():
+    """
+    Recomputes performance_rollup from quiz_attempt and assessment_result, reading them in
+    partitions of REBUILD_CHUNK rows. Returns the number of results rolled up.
+    """
+    db.session.execute(delete(PerformanceRollup))
+    total = 0
+
+    quiz_rows = (select(QuizAttempt.attempted_at, Quiz.topic, Quiz.class_level, QuizAttempt.score,
+                        QuizAttempt.total_questions, QuizAttempt.passed)
+                 .join(Quiz, Quiz.id == QuizAttempt.quiz_id)
+                 .execution_options(yield_per=REBUILD_CHUNK))
+    for partition in db.session.execute(quiz_rows).partitions():
+        attempted_at, topics, class_levels, scores, totals, passed = zip(*partition)
+        _add_rollups(rollup_rows('quiz', [moment.date() for moment in attempted_at], topics, class_levels,
+                                 _percentages(scores, totals), passed))
+        total += len(partition)
+
+    assessment_rows = (select(AssessmentResult.submitted_at, AssessmentResult.class_level,
+                              AssessmentResult.score, AssessmentResult.total_questions)
+                       .execution_options(yield_per=REBUILD_CHUNK))
+    for partition in db.session.execute(assessment_rows).partitions():
+        submitted_at, class_levels, scores, totals = zip(*partition)
+        percentages = _percentages(scores, totals)
+        _add_rollups(rollup_rows('assessment', [moment.date() for moment in submitted_at],
+                                 [ASSESSMENT_TOPIC] * len(partition), class_levels,
+                                 percentages, percentages >= ASSESSMENT_PASS_PERCENT))
+        total += len(partition)
+
+    db.session.commit()
+    return total
+
+
+def _rates(attempts, passed, pct_sums):
+    safe = np.maximum(attempts, 1)
+    return passed / safe * 100, pct_sums / safe
+
+
+def summarize(days=30, class_level=None, source=None):
+    """
+    Reduces the rollups of the last `days` days (optionally one class level / source) to a
+    per-group breakdown with score histograms, a per-day trend and overall totals.
+    Also returns the class levels and sources present in that window, for the filters.
+    """
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    rows = db.session.execute(
+        select(PerformanceRollup.day, PerformanceRollup.source, PerformanceRollup.topic,
+               PerformanceRollup.class_level, PerformanceRollup.score_bin, PerformanceRollup.attempts,
+               PerformanceRollup.passed, PerformanceRollup.score_pct_sum)
+        .where(PerformanceRollup.day >= since)
+    ).all()
+    class_levels = sorted({row.class_level for row in rows})
+    sources = sorted({row.source for row in rows})
+    rows = [row for row in rows
+            if (not class_level or row.class_level == class_level) and (not source or row.source == source)]
+
+    summary = {'class_levels': class_levels, 'sources': sources, 'groups': [], 'trend': [],
+               'attempts': 0, 'pass_rate': 0.0, 'mean_score': 0.0, 'histogram': [0] * BINS}
+    if not rows:
+        return summary
+
+    day_keys, sources_col, topics, levels, bins, attempts, passed, pct_sums = zip(*rows)
+    bins = np.array(bins, dtype=int)
+    attempts = np.array(attempts, dtype=float)
+    passed = np.array(passed, dtype=float)
+    pct_sums = np.array(pct_sums, dtype=float)
+
+    # Breakdown per (source, topic, class level), with a histogram row for each
+    groups, index = _group_index(zip(sources_col, topics, levels))
+    group_attempts = np.bincount(index, weights=attempts, minlength=len(groups))
+    group_pass, group_mean = _rates(group_attempts, np.bincount(index, weights=passed, minlength=len(groups)),
+                                    np.bincount(index, weights=pct_sums, minlength=len(groups)))
+    histograms = np.bincount(index * BINS + bins, weights=attempts,
+                             minlength=len(groups) * BINS).reshape(len(groups), BINS).astype(int)
+    summary['groups'] = sorted(
+        (GroupSummary(group_source, topic, level, int(group_attempts[i]), round(float(group_pass[i]), 1),
+                      round(float(group_mean[i]), 1), histograms[i].tolist())
+         for i, (group_source, topic, level) in enumerate(groups)),
+        key=lambda group: (group.class_level, group.source, group.topic))
+
+    # Daily trend
+    trend_days, index = _group_index(day_keys)
+    day_attempts = np.bincount(index, weights=attempts, minlength=len(trend_days))
+    day_pass, day_mean = _rates(day_attempts, np.bincount(index, weights=passed, minlength=len(trend_days)),
+                                np.bincount(index, weights=pct_sums, minlength=len(trend_days)))
+    summary['trend'] = sorted(
+        DaySummary(day, int(day_attempts[i]), round(float(day_pass[i]), 1), round(float(day_mean[i]), 1))
+        for i, day in enumerate(trend_days))
+
+    total_attempts = attempts.sum()
+    overall_pass, overall_mean = _rates(total_attempts, passed.sum(), pct_sums.sum())
+    summary.update(attempts=int(total_attempts), pass_rate=round(float(overall_pass), 1),
+                   mean_score=round(float(overall_mean), 1), histogram=histograms.sum(axis=0).tolist())
+    return summary
+
+
+@analytics.route('/analytics')
+@admin_required
+def dashboard():
+    days = request.args.get('days', 30, type=int)
+    days = min(max(days or 30, 1), MAX_DAYS)
+    selected_class_level = request.args.get('class_level') or None
+    selected_source = request.args.get('source') or None
+    summary = summarize(days, selected_class_level, selected_source)
+    return render_template('analytics.html', summary=summary, days=days, bins=BINS,
+                           selected_class_level=selected_class_level, selected_source=selected_source)
@@ -0,0 +1,11 @@
+# api.py
+from flask import request
+
+
+def json_object_body():
+    """
+    The request's JSON body when it is an object, otherwise {}: a missing, malformed or
+    non-object body then fails the endpoint's own validation with its usual 400.
+    """
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else {}
@@ -7,6 +7,9 @@ from flask_login import login_required # Keep this import if used elsewhere, but
 from datetime import datetime
 import os
 import json
+from extensions import db
+from models import AssessmentResult
+from analytics import record_assessment_result
 
 # Create the Blueprint
 assessment_bp = Blueprint('assessment', __name__, url_prefix='/assessment')
@@ -15,9 +18,16 @@ assessment_bp = Blueprint('assessment', __name__, url_prefix='/assessment')
 # The path to the JSON key file is made robust here
 SCOPE = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
 json_keyfile_path = os.path.join(os.path.dirname(__file__), 'numerify-468407-2c84f80eaebd.json')
-CREDS = ServiceAccountCredentials.from_json_keyfile_name(json_keyfile_path, SCOPE)
-CLIENT = gspread.authorize(CREDS)
-SHEET = CLIENT.open('numerify quiz').sheet1
+_sheet = None
+
+def get_sheet():
+    """Connects to the results sheet on first use, so the app can start without network access"""
+    global _sheet
+    if _sheet is None:
+        creds = ServiceAccountCredentials.from_json_keyfile_name(json_keyfile_path, SCOPE)
+        client = gspread.authorize(creds)
+        _sheet = client.open('numerify quiz').sheet1
+    return _sheet
 
 # --- Define the headers for your Google Sheet ---
 SHEET_HEADERS = [
@@ -28,19 +38,20 @@ SHEET_HEADERS = [
 def ensure_headers_exist():
     """Ensures that the Google Sheet has proper headers in the first row"""
     try:
+        sheet = get_sheet()
         # Get all values in the sheet
-        all_values = SHEET.get_all_values()
+        all_values = sheet.get_all_values()
         
         # If sheet is empty or first row doesn't match our headers
         if not all_values or all_values[0] != SHEET_HEADERS:
             print("Setting up headers in Google Sheet...")
             
             # Clear the sheet and add headers
-            SHEET.clear()
-            SHEET.append_row(SHEET_HEADERS)
+            sheet.clear()
+            sheet.append_row(SHEET_HEADERS)
             
             # Make headers bold and freeze the first row
-            SHEET.format('1:1', {
+            sheet.format('1:1', {
                 'textFormat': {'bold': True},
                 'backgroundColor': {'red': 0.9, 'green': 0.9, 'blue': 0.9}
             })
@@ -146,6 +157,20 @@ def submit_test():
         score_percentage = f"{(score / total_questions) * 100:.0f}%" if total_questions > 0 else "0%"
 
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        # Keep our own copy first, so results survive a Sheets outage and can be exported in-app
+        result = AssessmentResult(
+            name=student_details.get('name') or '',
+            class_level=student_details.get('class', ''),
+            school=student_details.get('school'),
+            register_number=student_details.get('register_number'),
+            questions_attempted=questions_attempted,
+            score=score,
+            total_questions=total_questions,
+        )
+        db.session.add(result)
+        record_assessment_result(result) # Teacher analytics rollup, same transaction
+        db.session.commit()
         
         # Create a dictionary mapping headers to values for better readability
         data_dict = {
@@ -166,19 +191,24 @@ def submit_test():
         for header, value in data_dict.items():
             print(f"  {header}: {value}")
 
-        print("Ensuring headers exist in Google Sheet...")
-        ensure_headers_exist()
+        try:
+            print("Ensuring headers exist in Google Sheet...")
+            ensure_headers_exist()
 
-        print("Attempting to write data to Google Sheet...")
-        SHEET.append_row(row_to_insert)
-        
-        print("Successfully wrote to Google Sheet.")
-        print(f"Row inserted: {row_to_insert}")
+            print("Attempting to write data to Google Sheet...")
+            get_sheet().append_row(row_to_insert)
+
+            print("Successfully wrote to Google Sheet.")
+            print(f"Row inserted: {row_to_insert}")
+        except Exception as e:
+            # The result is already stored locally; the sheet is only a mirror
+            print(f"Could not write to Google Sheet (result saved locally): {e}")
         
         flash('Your test has been submitted successfully!', 'success')
         return redirect(url_for('assessment.thank_you'))
 
     except Exception as e:
+        db.session.rollback()
         print(f"An error occurred during submission: {e}")
         import traceback
         traceback.print_exc()
@@ -1,13 +1,37 @@
 # auth.py
-from flask import Blueprint, render_template, request, redirect, url_for, flash
-from werkzeug.security import generate_password_hash, check_password_hash
+from functools import wraps
+from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, current_app
 from flask_login import login_user, logout_user, login_required, current_user
 from models import User # cite: 1
-from extensions import db # cite: 1
+from extensions import db, credentials # cite: 1
+from credentials import CredentialServiceBusy
+from sqlalchemy import or_
 from sqlalchemy.exc import IntegrityError # Import IntegrityError
 
 auth = Blueprint('auth', __name__)
 
+def is_admin(user):
+    """
+    Staff accounts are listed by username in the ADMIN_USERNAMES config key. Those names cannot be
+    registered through the public form (or the first visitor to pick one would become staff);
+    create the accounts with `flask create-admin` instead
+    """
+    return user.is_authenticated and user.username in current_app.config['ADMIN_USERNAMES']
+
+@auth.app_context_processor
+def inject_admin_flag():
+    return {'is_admin': is_admin(current_user)}
+
+def admin_required(view):
+    """Like login_required, but also answers 403 for users who are not admins"""
+    @wraps(view)
+    @login_required
+    def wrapped(*args, **kwargs):
+        if not is_admin(current_user):
+            abort(403)
+        return view(*args, **kwargs)
+    return wrapped
+
 @auth.route('/login', methods=['GET', 'POST'])
 def login():
     # If user is already logged in, redirect to dashboard
@@ -17,12 +41,34 @@ def login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
+
+        # Refuse repeated failures before spending any CPU on hashing. The strict limit is per
+        # (username, IP), so guessing at someone's username from elsewhere cannot lock them out;
+        # the per-IP limit only stops one address from trying many usernames
+        ip = request.remote_addr
+        user_key = (username, ip)
+        if credentials.limiter.is_limited(user_key) or credentials.ip_limiter.is_limited(ip):
+            flash('Too many failed login attempts. Please wait a few minutes and try again.', 'danger')
+            return render_template('login.html'), 429
+
         user = User.query.filter_by(username=username).first() # cite: 1
-        if user and check_password_hash(user.password, password):
+        try:
+            valid = user is not None and credentials.verify_password(user, password)
+        except CredentialServiceBusy:
+            flash('The server is busy right now. Please try logging in again in a moment.', 'warning')
+            return render_template('login.html'), 503
+
+        if valid:
+            credentials.limiter.reset(user_key) # Not the per-IP count: one valid login must not clear it
+            # verify_password may have upgraded an outdated hash on the user object
+            if user in db.session.dirty:
+                db.session.commit()
             login_user(user)
             flash('Logged in successfully!', 'success')
             return redirect(url_for('problems.dashboard'))
         else:
+            credentials.limiter.record_failure(user_key)
+            credentials.ip_limiter.record_failure(ip)
             flash('Invalid username or password.', 'danger')
     return render_template('login.html')
 
@@ -36,17 +82,26 @@ def register():
         username = request.form['username']
         email = request.form['email']
         password = request.form['password']
-        
-        # Check if username or email already exists
-        if User.query.filter_by(username=username).first(): # cite: 1
-            flash('Username already exists. Please choose a different one.', 'warning')
+
+        if username in current_app.config['ADMIN_USERNAMES']:
+            flash('That username is reserved. Please choose a different one.', 'warning')
             return render_template('register.html')
-        if User.query.filter_by(email=email).first(): # cite: 1
-            flash('Email already registered. Please use a different email.', 'warning')
+        
+        # Check if username or email already exists (one query for both)
+        existing_user = User.query.filter(or_(User.username == username, User.email == email)).first() # cite: 1
+        if existing_user:
+            if existing_user.username == username:
+                flash('Username already exists. Please choose a different one.', 'warning')
+            else:
+                flash('Email already registered. Please use a different email.', 'warning')
             return render_template('register.html')
 
-        # Changed the hash method to 'pbkdf2:sha256' for compatibility with werkzeug.security
-        hashed_password = generate_password_hash(password, method='pbkdf2:sha256') 
+        # Hashing runs on the credential service's process pool (method set by PASSWORD_HASH_METHOD)
+        try:
+            hashed_password = credentials.hash_password(password)
+        except CredentialServiceBusy:
+            flash('The server is busy right now. Please try registering again in a moment.', 'warning')
+            return render_template('register.html'), 503
         new_user = User(username=username, email=email, password=hashed_password) # cite: 1
         
         try:
@@ -0,0 +1,386 @@
+# benchmarks/run.py
+"""
+Benchmark suite for the app's hot routes.
+
+Seeds a synthetic database, then drives each scenario either in-process through the
+Flask test client (`--mode client`, also counts SQL queries per request) or as
+concurrent HTTP against a gunicorn server (`--mode http`). Results can be stored as a
+baseline and later runs compared against it.
+
+Examples (from the repository root):
+    python -m benchmarks.run --scale small
+    python -m benchmarks.run --scale medium --save-baseline
+    python -m benchmarks.run --mode http --workers 4 --concurrency 16 --compare
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import numpy as np
+from sqlalchemy import event
+
+from benchmarks.seed import SCALES, BENCH_PASSWORD, seed_database
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+METRICS_TOKEN = 'bench'
+
+
+# --- Scenarios: each returns (method, path, form data, json body) for one request ---
+def _problem_submit(rng, ctx):
+    pid = rng.randint(1, ctx['scale']['problems'])
+    answer = str(pid) if rng.random() < 0.5 else 'wrong'
+    return 'POST', f'/problem/{pid}', {'answer': answer}, None
+
+def _quiz_grade(rng, ctx):
+    quiz_id = rng.randint(1, ctx['scale']['quizzes'])
+    form = {f'question_{qid}': str(rng.choice(option_ids)) for qid, option_ids in ctx['quiz_options'][quiz_id]}
+    return 'POST', f'/quiz/{quiz_id}/start', form, None
+
+def _graph_plotter(rng, ctx):
+    expression = rng.choice(['sin(x)', 'x**2 - 3*x + 2', 'exp(x/5)*cos(x)', 'sqrt(x**2 + 1)', 'log10(x**2 + 1)'])
+    return 'POST', '/graph-plotter', None, {'expression': expression}
+
+def _matrix_calculator(rng, ctx):
+    n = rng.randint(2, 6)
+    a = [[rng.uniform(-10, 10) for _ in range(n)] for _ in range(n)]
+    b = [[rng.uniform(-10, 10) for _ in range(n)] for _ in range(n)]
+    return 'POST', '/matrix-calculator', None, {'matrix_a': a, 'matrix_b': b, 'operation': rng.choice(['add', 'multiply'])}
+
+SCENARIOS = {
+    'problem_submit': _problem_submit,
+    'quiz_grade': _quiz_grade,
+    'dashboard': lambda rng, ctx: ('GET', '/dashboard', None, None),
+    'leaderboard': lambda rng, ctx: ('GET', '/leaderboard', None, None),
+    'quiz_selection': lambda rng, ctx: ('GET', '/quizzes', None, None),
+    'graph_plotter': _graph_plotter,
+    'matrix_calculator': _matrix_calculator,
+}
+
+
+def _summarize(latencies_ms, wall_seconds, errors, queries=None):
+    latencies = np.asarray(latencies_ms, dtype=float)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if latencies.size else (0.0, 0.0, 0.0)
+    summary = {
+        'requests': int(latencies.size),
+        'errors': errors,
+        'throughput_rps': round(latencies.size / wall_seconds, 2) if wall_seconds else 0.0,
+        'p50_ms': round(float(p50), 2),
+        'p95_ms': round(float(p95), 2),
+        'p99_ms': round(float(p99), 2),
+    }
+    if queries is not None:
+        summary['avg_queries'] = round(sum(queries) / len(queries), 2) if queries else 0.0
+    return summary
+
+
+def _load_quiz_options():
+    from models import Question, Option
+    from extensions import db
+    quiz_options = {}
+    rows = db.session.query(Question.quiz_id, Question.id, Option.id)\
+                     .join(Option, Option.question_id == Question.id)\
+                     .order_by(Question.quiz_id, Question.id).all()
+    for quiz_id, question_id, option_id in rows:
+        questions = quiz_options.setdefault(quiz_id, [])
+        if not questions or questions[-1][0] != question_id:
+            questions.append((question_id, []))
+        questions[-1][1].append(option_id)
+    return quiz_options
+
+
+def prepare_database(db_path, scale):
+    """Creates the app against `db_path`, seeds it and returns (app, context for scenarios)."""
+    from app import create_app
+    work_dir = os.path.dirname(db_path)
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+        'RELOAD_PROBLEMS_ON_STARTUP': False,
+        # Keep the cache file and submission logs with the throwaway database, out of instance/
+        'CACHE_SQLITE_PATH': os.path.join(work_dir, 'cache.sqlite3'),
+        'SUBMISSION_LOG_DIR': os.path.join(work_dir, 'submission_log'),
+    })
+    with app.app_context():
+        started = time.perf_counter()
+        seed_database(scale)
+        print(f"Seeded {db_path} in {time.perf_counter() - started:.1f}s: {scale}")
+        ctx = {'scale': scale, 'quiz_options': _load_quiz_options()}
+    return app, ctx
+
+
+# --- In-process mode ---
+def run_client(app, ctx, scenarios, requests_per_scenario, warmup, seed):
+    from extensions import db
+    rng = random.Random(seed)
+    results = {}
+    client = app.test_client()
+    client.post('/login', data={'username': 'bench1', 'password': BENCH_PASSWORD})
+
+    with app.app_context():
+        engine = db.engine
+    query_count = [0]
+
+    def count_query(*args):
+        query_count[0] += 1
+
+    event.listen(engine, 'after_cursor_execute', count_query)
+    try:
+        for name in scenarios:
+            make_request = SCENARIOS[name]
+            for _ in range(warmup):
+                method, path, form, body = make_request(rng, ctx)
+                client.open(path, method=method, data=form, json=body)
+
+            latencies, queries, errors = [], [], 0
+            started = time.perf_counter()
+            for _ in range(requests_per_scenario):
+                method, path, form, body = make_request(rng, ctx)
+                query_count[0] = 0
+                t0 = time.perf_counter()
+                response = client.open(path, method=method, data=form, json=body)
+                latencies.append((time.perf_counter() - t0) * 1000)
+                queries.append(query_count[0])
+                if response.status_code >= 400:
+                    errors += 1
+            results[name] = _summarize(latencies, time.perf_counter() - started, errors, queries)
+            print(f"  {name}: done")
+    finally:
+        event.remove(engine, 'after_cursor_execute', count_query)
+    return results
+
+
+# --- HTTP mode ---
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _start_gunicorn(db_path, workers, port):
+    work_dir = os.path.dirname(db_path)
+    env = dict(os.environ,
+               FLASK_SQLALCHEMY_DATABASE_URI=f'sqlite:///{db_path}',
+               FLASK_RELOAD_PROBLEMS_ON_STARTUP='false',
+               FLASK_CACHE_SQLITE_PATH=os.path.join(work_dir, 'cache.sqlite3'),
+               FLASK_SUBMISSION_LOG_DIR=os.path.join(work_dir, 'submission_log'),
+               METRICS_TOKEN=METRICS_TOKEN)
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # Server output goes to a file next to the database; a pipe could fill up and stall the workers
+    log_path = os.path.join(os.path.dirname(db_path), 'gunicorn.log')
+    with open(log_path, 'wb') as log:
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}', 'app:create_app()'],
+            cwd=repo_root, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            with open(log_path, 'r', encoding='utf-8', errors='replace') as log:
+                raise RuntimeError(f"gunicorn exited early:\n{log.read()}")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('gunicorn did not start within 60s')
+
+
+def _http_client(base_url, user_index):
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+    _http_call(opener, base_url, 'POST', '/login', {'username': f'bench{user_index}', 'password': BENCH_PASSWORD}, None)
+    return opener
+
+
+def _http_call(opener, base_url, method, path, form, body):
+    headers, data = {}, None
+    if form is not None:
+        data = urllib.parse.urlencode(form).encode()
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+    elif body is not None:
+        data = json.dumps(body).encode()
+        headers['Content-Type'] = 'application/json'
+    req = urllib.request.Request(base_url + path, data=data, headers=headers, method=method)
+    try:
+        with opener.open(req, timeout=60) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as exc:
+        exc.read()
+        return exc.code
+
+
+def _metrics(base_url, reset=False):
+    url = f"{base_url}/metrics?token={METRICS_TOKEN}" + ('&reset=1' if reset else '')
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def run_http(db_path, ctx, scenarios, requests_per_scenario, warmup, seed, workers, concurrency):
+    port = _free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    server = _start_gunicorn(db_path, workers, port)
+    results = {}
+    try:
+        openers = [_http_client(base_url, (i % ctx['scale']['users']) + 1) for i in range(concurrency)]
+        for name in scenarios:
+            make_request = SCENARIOS[name]
+            rngs = [random.Random(seed + i) for i in range(concurrency)]
+            for i in range(warmup):
+                method, path, form, body = make_request(rngs[0], ctx)
+                _http_call(openers[i % concurrency], base_url, method, path, form, body)
+            if workers == 1:
+                _metrics(base_url, reset=True)
+
+            latencies, errors = [], [0]
+            lock = threading.Lock()
+
+            def worker(index, count):
+                local = []
+                local_errors = 0
+                for _ in range(count):
+                    method, path, form, body = make_request(rngs[index], ctx)
+                    t0 = time.perf_counter()
+                    status = _http_call(openers[index], base_url, method, path, form, body)
+                    local.append((time.perf_counter() - t0) * 1000)
+                    if status >= 400:
+                        local_errors += 1
+                with lock:
+                    latencies.extend(local)
+                    errors[0] += local_errors
+
+            share, extra = divmod(requests_per_scenario, concurrency)
+            threads = [threading.Thread(target=worker, args=(i, share + (1 if i < extra else 0)))
+                       for i in range(concurrency)]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            wall = time.perf_counter() - started
+
+            queries = None
+            if workers == 1:
+                # Query counts are tracked per worker, so they are only exact with a single worker
+                endpoints = _metrics(base_url)['endpoints']
+                endpoints.pop('metrics.show_metrics', None)
+                handled = sum(stats['requests'] for stats in endpoints.values())
+                queries = [sum(stats['queries'] for stats in endpoints.values()) / handled] if handled else []
+            results[name] = _summarize(latencies, wall, errors[0], queries)
+            print(f"  {name}: done")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return results
+
+
+# --- Reporting ---
+def compare(results, baseline, tolerance):
+    """Prints a comparison table and returns the names of scenarios that regressed."""
+    regressions = []
+    print(f"\n{'scenario':<20}{'rps':>10}{'base rps':>10}{'p95 ms':>10}{'base p95':>10}{'queries':>9}{'base q':>8}  status")
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"{name:<20}{current['throughput_rps']:>10}{'-':>10}{current['p95_ms']:>10}{'-':>10}"
+                  f"{current.get('avg_queries', '-'):>9}{'-':>8}  new")
+            continue
+        slower = current['p95_ms'] > base['p95_ms'] * (1 + tolerance)
+        less_throughput = current['throughput_rps'] < base['throughput_rps'] * (1 - tolerance)
+        more_queries = 'avg_queries' in current and 'avg_queries' in base and current['avg_queries'] > base['avg_queries']
+        status = 'REGRESSED' if (slower or less_throughput or more_queries) else 'ok'
+        if status != 'ok':
+            regressions.append(name)
+        print(f"{name:<20}{current['throughput_rps']:>10}{base['throughput_rps']:>10}{current['p95_ms']:>10}"
+              f"{base['p95_ms']:>10}{current.get('avg_queries', '-'):>9}{base.get('avg_queries', '-'):>8}  {status}")
+    return regressions
+
+
+def print_results(results):
+    print(f"\n{'scenario':<20}{'reqs':>7}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}")
+    for name, r in results.items():
+        print(f"{name:<20}{r['requests']:>7}{r['errors']:>8}{r['throughput_rps']:>10}{r['p50_ms']:>10}"
+              f"{r['p95_ms']:>10}{r['p99_ms']:>10}{r.get('avg_queries', '-'):>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the hot routes of the math app.')
+    parser.add_argument('--mode', choices=['client', 'http'], default='client')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    for key in SCALES['small']:
+        parser.add_argument(f"--{key.replace('_', '-')}", type=int, help=f'override the scale\'s {key}')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='comma-separated subset of scenarios')
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per scenario')
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--concurrency', type=int, default=8, help='client threads (http mode)')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers (http mode)')
+    parser.add_argument('--db', help='SQLite file to seed (defaults to a temporary file)')
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--compare', action='store_true', help='compare against the baseline; exit 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='allowed relative slowdown before flagging')
+    args = parser.parse_args(argv)
+
+    scale = dict(SCALES[args.scale])
+    for key in scale:
+        override = getattr(args, key)
+        if override is not None:
+            scale[key] = override
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    db_path = os.path.abspath(args.db) if args.db else os.path.join(tempfile.mkdtemp(prefix='mathbench-'), 'bench.sqlite3')
+    app, ctx = prepare_database(db_path, scale)
+
+    print(f"Running {len(scenarios)} scenarios in {args.mode} mode, {args.requests} requests each")
+    if args.mode == 'client':
+        results = run_client(app, ctx, scenarios, args.requests, args.warmup, args.seed)
+    else:
+        results = run_http(db_path, ctx, scenarios, args.requests, args.warmup, args.seed, args.workers, args.concurrency)
+    print_results(results)
+
+    report = {'mode': args.mode, 'scale': scale, 'results': results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    exit_code = 0
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"\nNo baseline at {args.baseline}; run with --save-baseline first.")
+        else:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            if stored.get('mode') != args.mode or stored.get('scale') != scale:
+                print('\nWarning: baseline was recorded with a different mode or scale.')
+            regressions = compare(results, stored.get('results', {}), args.tolerance)
+            if regressions:
+                print(f"\nRegressions: {', '.join(regressions)}")
+                exit_code = 1
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+# benchmarks/seed.py
+"""Builds a synthetic database at a configurable scale for the benchmark suite."""
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+from extensions import db
+from cache import cache
+from models import User, Problem, Submission, Video, Quiz, Question, Option, QuizAttempt, Post
+
+# Every seeded user logs in with this password
+BENCH_PASSWORD = 'benchpass'
+
+TOPICS = ['Algebra', 'Geometry', 'Calculus', 'Trigonometry', 'Probability', 'Statistics', 'Number Theory']
+CLASS_LEVELS = ['Class 8', 'Class 9', 'Class 10', 'Class 11', 'Class 12']
+
+SCALES = {
+    'small': dict(users=50, problems=200, submissions=2000, quizzes=20, questions_per_quiz=10,
+                  options_per_question=4, quiz_attempts=500, posts=100, videos=50),
+    'medium': dict(users=500, problems=2000, submissions=50000, quizzes=100, questions_per_quiz=20,
+                   options_per_question=4, quiz_attempts=10000, posts=2000, videos=500),
+    'large': dict(users=5000, problems=10000, submissions=500000, quizzes=500, questions_per_quiz=30,
+                  options_per_question=4, quiz_attempts=100000, posts=20000, videos=2000),
+}
+
+BATCH_SIZE = 5000
+
+
+def _insert(model, rows):
+    """Bulk-inserts plain dicts in batches (executemany under the hood)."""
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(insert(model), rows[start:start + BATCH_SIZE])
+
+
+def seed_database(scale, seed=1234):
+    """
+    Drops and recreates every table, then fills them according to `scale` (a dict like
+    the ones in SCALES). Must run inside an application context. Returns the scale used.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+
+    db.drop_all()
+    db.create_all()
+
+    # One hash shared by all users: the salt is embedded in the hash, so it verifies for every row
+    password_hash = generate_password_hash(BENCH_PASSWORD, method='pbkdf2:sha256')
+    _insert(User, [
+        dict(id=i, username=f'bench{i}', email=f'bench{i}@example.com', password=password_hash,
+             college='Bench College', bio='Synthetic user', interests=rng.choice(TOPICS),
+             solved_problems_count=0, total_problems_attempted=0, score=rng.randint(0, 5000))
+        for i in range(1, scale['users'] + 1)
+    ])
+
+    # Problems have integer answers equal to their id, so benchmarks can submit known-correct answers
+    _insert(Problem, [
+        dict(id=i, title=f'Synthetic problem {i}', description=f'Compute the value of problem {i}.',
+             topic=rng.choice(TOPICS), difficulty_level=rng.randint(1, 3), answer=str(i))
+        for i in range(1, scale['problems'] + 1)
+    ])
+
+    _insert(Submission, [
+        dict(user_id=rng.randint(1, scale['users']), problem_id=pid,
+             submitted_answer=str(pid) if accepted else 'wrong',
+             result='Accepted' if accepted else 'Wrong Answer',
+             timestamp=now - timedelta(minutes=rng.randint(0, 60 * 24 * 90)))
+        for pid, accepted in ((rng.randint(1, scale['problems']), rng.random() < 0.4)
+                              for _ in range(scale['submissions']))
+    ])
+
+    questions, options = [], []
+    question_id, option_id = 0, 0
+    for quiz_id in range(1, scale['quizzes'] + 1):
+        for _ in range(scale['questions_per_quiz']):
+            question_id += 1
+            questions.append(dict(id=question_id, quiz_id=quiz_id, text=f'Question {question_id}?'))
+            correct = rng.randrange(scale['options_per_question'])
+            for index in range(scale['options_per_question']):
+                option_id += 1
+                options.append(dict(id=option_id, question_id=question_id, text=f'Option {index + 1}',
+                                    is_correct=index == correct))
+    _insert(Quiz, [
+        dict(id=i, title=f'Synthetic quiz {i}', topic=rng.choice(TOPICS), class_level=rng.choice(CLASS_LEVELS),
+             pass_mark=max(1, scale['questions_per_quiz'] // 2))
+        for i in range(1, scale['quizzes'] + 1)
+    ])
+    _insert(Question, questions)
+    _insert(Option, options)
+
+    total = scale['questions_per_quiz']
+    attempts = []
+    for _ in range(scale['quiz_attempts']):
+        score = rng.randint(0, total)
+        attempts.append(dict(user_id=rng.randint(1, scale['users']), quiz_id=rng.randint(1, scale['quizzes']),
+                             score=score, total_questions=total, passed=score >= total // 2,
+                             attempted_at=now - timedelta(minutes=rng.randint(0, 60 * 24 * 90))))
+    _insert(QuizAttempt, attempts)
+
+    _insert(Post, [
+        dict(user_id=rng.randint(1, scale['users']), title=f'Synthetic post {i}', content='Lorem ipsum ' * 20,
+             created_at=now - timedelta(minutes=i))
+        for i in range(1, scale['posts'] + 1)
+    ])
+    _insert(Video, [
+        dict(title=f'Synthetic video {i}', description='Synthetic lecture', youtube_id=f'bench{i:07d}',
+             topic=rng.choice(TOPICS), class_level=rng.choice(CLASS_LEVELS), uploaded_at=now - timedelta(hours=i))
+        for i in range(1, scale['videos'] + 1)
+    ])
+
+    db.session.commit()
+    # Bulk inserts fire no model events; drop anything cached from an earlier seed of this database
+    cache.clear()
+    return scale
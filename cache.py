@@ -0,0 +1,376 @@
+# cache.py
+"""
+Application cache with pluggable backends, shared by every gunicorn worker on the box.
+
+Backends (CACHE_BACKEND):
+    'sqlite'  One SQLite file on local disk (WAL mode, memory-mapped), shared by all workers.
+    'local'   In-process LRU; fastest, but each worker keeps (and invalidates) its own copy.
+    'redis'   Any Redis-compatible server at CACHE_REDIS_URL (needs `pip install redis`).
+    'null'    Caches nothing.
+
+Entries live in namespaces ('problems', 'leaderboard', ...). Every namespace has a
+generation counter kept in the backend and included in its keys, so invalidating a
+namespace is one increment that all workers see at once; the old entries are never read
+again and expire with their TTL. Model writes invalidate the namespaces that depend on
+them once their transaction commits (see the hooks at the end of this module).
+"""
+import hashlib
+import logging
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from lru import LRUCache
+from models import Problem, Quiz, Question, Option, Post, Video, User
+
+try:
+    import redis # Optional: only needed for CACHE_BACKEND = 'redis'
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class LocalBackend:
+    """In-process LRU with per-entry expiry."""
+
+    name = 'local'
+
+    def __init__(self, maxsize=1024):
+        self._entries = LRUCache(maxsize=maxsize)
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at < time.time():
+            self._entries.pop(key)
+            return None
+        return value
+
+    def set(self, key, value, timeout):
+        self._entries.set(key, (time.time() + timeout if timeout else None, value))
+
+    def get_counter(self, key):
+        return self._counters.get(key, 0)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def clear(self):
+        self._entries.clear()
+        with self._lock:
+            self._counters.clear()
+
+
+class SQLiteBackend:
+    """
+    Key/value tables in a local SQLite file. WAL mode lets readers in every worker run
+    concurrently with the (short) writes; expired rows are swept now and then on writes.
+    """
+
+    name = 'sqlite'
+    SWEEP_PROBABILITY = 0.01
+
+    def __init__(self, path, prefix, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._prefix = prefix
+        self._local = threading.local()
+
+    def _connection(self):
+        # One connection per thread and process (sqlite3 connections must not cross a fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL') # A lost cache write after a power cut is harmless
+        conn.execute('PRAGMA mmap_size=67108864')
+        conn.execute('CREATE TABLE IF NOT EXISTS cache_entry (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)')
+        conn.execute('CREATE TABLE IF NOT EXISTS cache_counter (key TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key):
+        row = self._connection().execute(
+            'SELECT value, expires_at FROM cache_entry WHERE key = ?', (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return None
+        return pickle.loads(row[0])
+
+    def set(self, key, value, timeout):
+        conn = self._connection()
+        conn.execute('INSERT OR REPLACE INTO cache_entry (key, value, expires_at) VALUES (?, ?, ?)',
+                     (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), time.time() + timeout if timeout else None))
+        if random.random() < self.SWEEP_PROBABILITY:
+            self._sweep(conn)
+
+    def _sweep(self, conn):
+        conn.execute('DELETE FROM cache_entry WHERE expires_at < ?', (time.time(),))
+        # Still too big: drop the entries closest to expiring
+        conn.execute('DELETE FROM cache_entry WHERE key IN (SELECT key FROM cache_entry ORDER BY expires_at LIMIT '
+                     'max((SELECT count(*) FROM cache_entry) - ?, 0))', (self.max_entries,))
+
+    def get_counter(self, key):
+        row = self._connection().execute('SELECT value FROM cache_counter WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else 0
+
+    def incr(self, key):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('INSERT INTO cache_counter (key, value) VALUES (?, 1) '
+                         'ON CONFLICT(key) DO UPDATE SET value = value + 1', (key,))
+            value = conn.execute('SELECT value FROM cache_counter WHERE key = ?', (key,)).fetchone()[0]
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return value
+
+    def clear(self):
+        # Only this app's keys; the file may be shared with other databases' apps.
+        # substr rather than LIKE, which is case-insensitive and treats _ as a wildcard
+        conn = self._connection()
+        for table in ('cache_entry', 'cache_counter'):
+            conn.execute(f'DELETE FROM {table} WHERE substr(key, 1, ?) = ?', (len(self._prefix), self._prefix))
+
+
+class RedisBackend:
+    """Adapter for Redis or any server speaking its protocol."""
+
+    name = 'redis'
+
+    def __init__(self, url, prefix):
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND = 'redis' needs the redis package (pip install redis).")
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def get(self, key):
+        raw = self._client.get(key)
+        return None if raw is None else pickle.loads(raw)
+
+    def set(self, key, value, timeout):
+        self._client.set(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), ex=int(timeout) if timeout else None)
+
+    def get_counter(self, key):
+        return int(self._client.get(key) or 0)
+
+    def incr(self, key):
+        return self._client.incr(key)
+
+    def clear(self):
+        # Only this app's keys; the server may be shared
+        for key in self._client.scan_iter(match=f'{self._prefix}*', count=1000):
+            self._client.delete(key)
+
+
+class NullBackend:
+    name = 'null'
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, timeout):
+        pass
+
+    def get_counter(self, key):
+        return 0
+
+    def incr(self, key):
+        return 0
+
+    def clear(self):
+        pass
+
+
+class Cache:
+    """
+    Namespaced cache front end. Backend errors are logged and treated as misses, so a
+    broken cache slows requests down but never fails them.
+
+    Configuration keys:
+        CACHE_BACKEND          'sqlite', 'local', 'redis' or 'null'.
+        CACHE_DEFAULT_TIMEOUT  TTL in seconds for entries stored without an explicit timeout.
+        CACHE_KEY_PREFIX       Prefix for every key (defaults to one derived from the database URI,
+                               so apps on different databases never share entries).
+        CACHE_SQLITE_PATH      File used by the sqlite backend.
+        CACHE_SQLITE_MAX_ENTRIES  Size the sqlite backend is trimmed back to when swept.
+        CACHE_LOCAL_MAXSIZE    Entries kept by the local backend.
+        CACHE_REDIS_URL        Server used by the redis backend.
+    """
+
+    def __init__(self, app=None):
+        self.backend = LocalBackend()
+        self.prefix = ''
+        self.default_timeout = 300
+        self._stats_lock = threading.Lock()
+        self._stats = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        database_uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+        app.config.setdefault('CACHE_BACKEND', 'sqlite')
+        app.config.setdefault('CACHE_DEFAULT_TIMEOUT', 300)
+        app.config.setdefault('CACHE_KEY_PREFIX', f"mathhh:{hashlib.md5(database_uri.encode()).hexdigest()[:8]}:")
+        app.config.setdefault('CACHE_SQLITE_PATH', os.path.join(app.instance_path, 'cache.sqlite3'))
+        app.config.setdefault('CACHE_SQLITE_MAX_ENTRIES', 10000)
+        app.config.setdefault('CACHE_LOCAL_MAXSIZE', 1024)
+        app.config.setdefault('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+
+        self.prefix = app.config['CACHE_KEY_PREFIX']
+        self.default_timeout = app.config['CACHE_DEFAULT_TIMEOUT']
+        backend = app.config['CACHE_BACKEND']
+        if backend == 'sqlite':
+            self.backend = SQLiteBackend(app.config['CACHE_SQLITE_PATH'], self.prefix,
+                                         app.config['CACHE_SQLITE_MAX_ENTRIES'])
+        elif backend == 'local':
+            self.backend = LocalBackend(app.config['CACHE_LOCAL_MAXSIZE'])
+        elif backend == 'redis':
+            self.backend = RedisBackend(app.config['CACHE_REDIS_URL'], self.prefix)
+        elif backend == 'null':
+            self.backend = NullBackend()
+        else:
+            raise ValueError(f"Unknown CACHE_BACKEND {backend!r}")
+        app.extensions['cache'] = self
+
+    def _count(self, namespace, outcome):
+        with self._stats_lock:
+            stats = self._stats.setdefault(namespace, {'hits': 0, 'misses': 0, 'errors': 0})
+            stats[outcome] += 1
+
+    def generation(self, namespace):
+        """Current generation of a namespace; changes whenever the namespace is invalidated."""
+        try:
+            return self.backend.get_counter(f'{self.prefix}gen:{namespace}')
+        except Exception:
+            logger.exception('Cache generation lookup failed for %s', namespace)
+            self._count(namespace, 'errors')
+            return None
+
+    def get(self, namespace, key):
+        generation = self.generation(namespace)
+        value = None
+        if generation is not None:
+            try:
+                value = self.backend.get(f'{self.prefix}{namespace}:{generation}:{key}')
+            except Exception:
+                logger.exception('Cache read failed for %s:%s', namespace, key)
+                self._count(namespace, 'errors')
+        self._count(namespace, 'misses' if value is None else 'hits')
+        return value
+
+    def set(self, namespace, key, value, timeout=None):
+        generation = self.generation(namespace)
+        if generation is None:
+            return
+        try:
+            self.backend.set(f'{self.prefix}{namespace}:{generation}:{key}', value,
+                             self.default_timeout if timeout is None else timeout)
+        except Exception:
+            logger.exception('Cache write failed for %s:%s', namespace, key)
+            self._count(namespace, 'errors')
+
+    def get_or_set(self, namespace, key, factory, timeout=None):
+        """Returns the cached value, or calls `factory()` and caches its result (None is not cached)."""
+        value = self.get(namespace, key)
+        if value is None:
+            value = factory()
+            if value is not None:
+                self.set(namespace, key, value, timeout)
+        return value
+
+    def invalidate(self, *namespaces):
+        """Makes every entry of the given namespaces unreachable, in every worker."""
+        for namespace in namespaces:
+            try:
+                self.backend.incr(f'{self.prefix}gen:{namespace}')
+            except Exception:
+                logger.exception('Cache invalidation failed for %s', namespace)
+                self._count(namespace, 'errors')
+
+    def invalidate_on_commit(self, session, *namespaces):
+        """Invalidates the namespaces once `session` commits (dropped if it rolls back)."""
+        session.info.setdefault('cache_invalidate', set()).update(namespaces)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        with self._stats_lock:
+            return {'backend': self.backend.name, 'pid': os.getpid(),
+                    'namespaces': {name: dict(stats) for name, stats in sorted(self._stats.items())}}
+
+
+cache = Cache()
+
+
+# --- Invalidation hooks ---
+# Mapper events fire at flush time, inside the transaction; the namespaces are only bumped after
+# the commit, so no other worker can re-cache the old rows in between.
+_MODEL_NAMESPACES = {
+    Problem: ('problems',),
+    Quiz: ('quizzes',),
+    Question: ('quizzes',),
+    Option: ('quizzes',),
+    Post: ('posts',),
+    Video: ('videos',),
+}
+
+
+def _on_model_change(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        cache.invalidate_on_commit(session, *_MODEL_NAMESPACES[mapper.class_])
+
+
+def _on_user_change(mapper, connection, target):
+    session = object_session(target)
+    if session is None:
+        return
+    state = inspect(target)
+    if state.attrs.username.history.has_changes():
+        cache.invalidate_on_commit(session, 'leaderboard', 'posts') # Posts show their author's name
+    elif state.attrs.score.history.has_changes() or state.attrs.solved_problems_count.history.has_changes():
+        cache.invalidate_on_commit(session, 'leaderboard')
+
+
+def _on_user_insert_or_delete(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        cache.invalidate_on_commit(session, 'leaderboard')
+
+
+def _after_commit(session):
+    namespaces = session.info.pop('cache_invalidate', None)
+    if namespaces:
+        cache.invalidate(*namespaces)
+
+
+def _after_rollback(session):
+    session.info.pop('cache_invalidate', None)
+
+
+for _model in _MODEL_NAMESPACES:
+    for _event in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event, _on_model_change)
+event.listen(User, 'after_update', _on_user_change)
+event.listen(User, 'after_insert', _on_user_insert_or_delete)
+event.listen(User, 'after_delete', _on_user_insert_or_delete)
+event.listen(Session, 'after_commit', _after_commit)
+event.listen(Session, 'after_rollback', _after_rollback)
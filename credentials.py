@@ -0,0 +1,170 @@
+# credentials.py
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+from lru import LRUCache
+
+
+class CredentialServiceBusy(Exception):
+    """Raised when the hashing pool is saturated and a request should be retried later."""
+
+
+def _normalize_method(method):
+    """Expands a hash method to the fully specified form Werkzeug stores in the hash prefix."""
+    parts = method.split(':')
+    if parts[0] == 'pbkdf2' and len(parts) == 2:
+        return f"{method}:{DEFAULT_PBKDF2_ITERATIONS}"
+    if parts[0] == 'scrypt' and len(parts) == 1:
+        return 'scrypt:32768:8:1'
+    return method
+
+
+def _check_and_maybe_rehash(stored_hash, password, method):
+    """Runs inside the worker process: verifies a password and returns a fresh hash if the stored one is outdated."""
+    if not check_password_hash(stored_hash, password):
+        return False, None
+    if stored_hash.split('$', 1)[0] != method:
+        return True, generate_password_hash(password, method=method)
+    return True, None
+
+
+class RateLimiter:
+    """
+    Sliding-window counter of failed attempts, keyed by any hashable (username, IP, ...).
+    Only the `max_keys` most recently failing keys are tracked, so a flood of made-up
+    usernames cannot grow memory without bound.
+    """
+
+    def __init__(self, max_attempts=10, window=300, max_keys=10000):
+        self.max_attempts = max_attempts
+        self.window = window
+        self._attempts = LRUCache(maxsize=max_keys)
+        self._lock = threading.Lock()
+
+    def _count(self, key, now):
+        attempts = self._attempts.get(key)
+        if attempts is None:
+            return 0
+        while attempts and attempts[0] <= now - self.window:
+            attempts.popleft()
+        if not attempts:
+            self._attempts.pop(key)
+        return len(attempts)
+
+    def is_limited(self, *keys):
+        now = time.monotonic()
+        with self._lock:
+            return any(self._count(key, now) >= self.max_attempts for key in keys)
+
+    def record_failure(self, *keys):
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                # Only the newest max_attempts timestamps decide whether a key is limited
+                attempts = self._attempts.get(key) or deque(maxlen=self.max_attempts)
+                attempts.append(now)
+                self._attempts.set(key, attempts)
+
+    def reset(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._attempts.pop(key)
+
+
+class CredentialService:
+    """
+    Hashes and verifies passwords on a bounded process pool so PBKDF2/scrypt work
+    never runs on (or piles up behind) the request workers.
+
+    Configuration keys:
+        PASSWORD_HASH_METHOD   Werkzeug method string, e.g. 'pbkdf2:sha256:600000' or 'scrypt'.
+        PASSWORD_HASH_WORKERS  Size of the process pool; 0 hashes inline in the request worker.
+        PASSWORD_HASH_MAX_PENDING  Jobs allowed in flight before new ones are refused.
+        PASSWORD_HASH_TIMEOUT  Seconds to wait for a hashing job.
+        LOGIN_RATE_LIMIT       Failed attempts allowed per (username, IP) in the window.
+        LOGIN_RATE_LIMIT_PER_IP  Failed attempts allowed per IP in the window, for any usernames; much
+                               higher, since a classroom or school shares one NAT address.
+        LOGIN_RATE_WINDOW      Length of the window in seconds.
+        LOGIN_RATE_MAX_KEYS    Keys each limiter tracks before forgetting the least recent.
+    The limiters live in each worker process, so with N gunicorn workers the effective limits are
+    up to N times the configured ones. They key on request.remote_addr, which is only the client's
+    address behind a proxy when PROXY_FIX_X_FOR is set (see create_app).
+    """
+
+    def __init__(self, app=None):
+        self.method = _normalize_method('pbkdf2:sha256')
+        self.workers = 2
+        self.timeout = 10
+        self.limiter = RateLimiter() # Keyed by (username, IP)
+        self.ip_limiter = RateLimiter(100) # Keyed by IP
+        self._pool = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+        self._pending = threading.BoundedSemaphore(8)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
+        app.config.setdefault('PASSWORD_HASH_WORKERS', min(2, os.cpu_count() or 1))
+        app.config.setdefault('PASSWORD_HASH_MAX_PENDING', 8)
+        app.config.setdefault('PASSWORD_HASH_TIMEOUT', 10)
+        app.config.setdefault('LOGIN_RATE_LIMIT', 10)
+        app.config.setdefault('LOGIN_RATE_LIMIT_PER_IP', 100)
+        app.config.setdefault('LOGIN_RATE_WINDOW', 300)
+        app.config.setdefault('LOGIN_RATE_MAX_KEYS', 10000)
+
+        self.method = _normalize_method(app.config['PASSWORD_HASH_METHOD'])
+        self.workers = app.config['PASSWORD_HASH_WORKERS']
+        self.timeout = app.config['PASSWORD_HASH_TIMEOUT']
+        self._pending = threading.BoundedSemaphore(app.config['PASSWORD_HASH_MAX_PENDING'])
+        window, max_keys = app.config['LOGIN_RATE_WINDOW'], app.config['LOGIN_RATE_MAX_KEYS']
+        self.limiter = RateLimiter(app.config['LOGIN_RATE_LIMIT'], window, max_keys)
+        self.ip_limiter = RateLimiter(app.config['LOGIN_RATE_LIMIT_PER_IP'], window, max_keys)
+        app.extensions['credentials'] = self
+
+    def _get_pool(self):
+        # Pools do not survive a fork (gunicorn workers), so build one lazily per process
+        with self._pool_lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._pending.acquire(timeout=self.timeout):
+            raise CredentialServiceBusy()
+        try:
+            return self._get_pool().submit(fn, *args).result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise CredentialServiceBusy()
+        finally:
+            self._pending.release()
+
+    def hash_password(self, password):
+        """Returns a hash of `password` using the configured method."""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify_password(self, user, password):
+        """
+        Checks `password` against `user.password`. When the stored hash uses an older
+        method or cost, it is replaced on the user object (the caller commits).
+        """
+        valid, new_hash = self._run(_check_and_maybe_rehash, user.password, password, self.method)
+        if valid and new_hash:
+            user.password = new_hash
+        return valid
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -1,17 +1,30 @@
 # discuss.py
+from collections import namedtuple
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 from models import Post, User # Import User to get username for display
 from extensions import db
 from datetime import datetime # Import datetime
+from cache import cache
 
 discuss = Blueprint('discuss', __name__)
 
+# The fields of a post the forum page shows (post.author.username included); shared by every worker
+PostListing = namedtuple('PostListing', 'id title content created_at author')
+PostAuthor = namedtuple('PostAuthor', 'username')
+
+def post_listing():
+    # Fetch all posts, ordered by creation date (newest first), with their authors in the same query
+    rows = db.session.query(Post.id, Post.title, Post.content, Post.created_at, User.username)\
+                     .join(User, User.id == Post.user_id)\
+                     .order_by(Post.created_at.desc()).all()
+    return [PostListing(*row[:4], PostAuthor(row[4])) for row in rows]
+
 @discuss.route('/discuss')
 @login_required
 def forum_home():
-    # Fetch all posts, ordered by creation date (newest first)
-    posts = Post.query.order_by(Post.created_at.desc()).all()
+    # Cached until a post (or an author's name) changes: the 'posts' namespace
+    posts = cache.get_or_set('posts', 'all', post_listing)
     return render_template('discuss_forum.html', posts=posts)
 
 @discuss.route('/discuss/new_post', methods=['GET', 'POST'])
@@ -1,4 +1,5 @@
 # explore.py
+from collections import namedtuple
 from flask import Blueprint, render_template, request, jsonify # <-- Make sure jsonify is imported
 from flask_login import login_required
 from models import Video
@@ -10,26 +11,41 @@ import numpy as np
 import matplotlib
 matplotlib.use('Agg') # This is important for running Matplotlib in a non-GUI environment
 import matplotlib.pyplot as plt
+from linear_algebra import compute_batch, LinearAlgebraError, MAX_DIM
+from polynomial import solve_batch, PolynomialError
+from api import json_object_body
+from cache import cache
 # -----------------------------
 
 explore = Blueprint('explore', __name__)
 
-@explore.route('/explore')
-@login_required
-def explore_videos():
-    # --- YOUR EXISTING explore_videos FUNCTION REMAINS UNCHANGED ---
+# The fields of a video the explore page shows; cached listings are shared by every worker
+VideoListing = namedtuple('VideoListing', 'id title description youtube_id topic class_level uploaded_at')
+PLOT_CACHE_TIMEOUT = 86400 # Plots depend only on the expression
+
+def video_filters():
     topics = db.session.query(Video.topic).distinct().all()
     class_levels = db.session.query(Video.class_level).distinct().all()
-    topics = sorted([t[0] for t in topics])
-    class_levels = sorted([c[0] for c in class_levels])
-    selected_topic = request.args.get('topic')
-    selected_class_level = request.args.get('class_level')
-    query = Video.query
+    return sorted([t[0] for t in topics]), sorted([c[0] for c in class_levels])
+
+def video_listing(selected_topic, selected_class_level):
+    query = db.session.query(Video.id, Video.title, Video.description, Video.youtube_id,
+                             Video.topic, Video.class_level, Video.uploaded_at)
     if selected_topic and selected_topic != 'All Topics':
         query = query.filter_by(topic=selected_topic)
     if selected_class_level and selected_class_level != 'All Classes':
         query = query.filter_by(class_level=selected_class_level)
-    videos = query.order_by(Video.uploaded_at.desc()).all()
+    return [VideoListing(*row) for row in query.order_by(Video.uploaded_at.desc()).all()]
+
+@explore.route('/explore')
+@login_required
+def explore_videos():
+    selected_topic = request.args.get('topic')
+    selected_class_level = request.args.get('class_level')
+    # Filters and listings are cached until a video changes (the 'videos' namespace)
+    topics, class_levels = cache.get_or_set('videos', 'filters', video_filters)
+    videos = cache.get_or_set('videos', f'listing:{selected_topic}:{selected_class_level}',
+                              lambda: video_listing(selected_topic, selected_class_level))
     return render_template('explore.html',
                            videos=videos,
                            topics=topics,
@@ -45,6 +61,11 @@ def graph_plotter():
         data = request.get_json()
         expression = data.get('expression', '')
 
+        # The same expressions get plotted over and over (worksheets, shared links)
+        image_base64 = cache.get('plots', expression)
+        if image_base64 is not None:
+            return jsonify({'image': image_base64})
+
         # Sanitize the expression to make it safe
         allowed_names = {
             'x': None, 'sin': np.sin, 'cos': np.cos, 'tan': np.tan,
@@ -79,6 +100,7 @@ def graph_plotter():
 
             # Encode the image to base64 and send it back
             image_base64 = base64.b64encode(buf.getvalue()).decode('utf-8')
+            cache.set('plots', expression, image_base64, timeout=PLOT_CACHE_TIMEOUT)
             return jsonify({'image': image_base64})
 
         except Exception as e:
@@ -100,6 +122,9 @@ def matrix_calculator():
             matrix_b = np.array(data['matrix_b'], dtype=float)
             operation = data['operation']
 
+            if max(matrix_a.shape + matrix_b.shape) > MAX_DIM:
+                return jsonify({'error': f'Matrices can be at most {MAX_DIM}x{MAX_DIM}.'}), 400
+
             if operation == 'add':
                 if matrix_a.shape != matrix_b.shape:
                     return jsonify({'error': 'Matrices must have the same dimensions for addition.'}), 400
@@ -121,15 +146,24 @@ def matrix_calculator():
             return jsonify({'error': 'Invalid matrix format or calculation error.'}), 400
             
     return render_template('matrix_calculator.html')
-# (Keep all your existing imports and code)
-# --- ADD THIS NEW IMPORT FOR THE SOLVER ---
-import cmath # Use cmath to handle complex roots gracefully
-# -----------------------------------------
-
-# (Your existing routes for explore_videos, graph_plotter, matrix_calculator are here)
-# ...
 
-# --- ADD THIS ENTIRE NEW ROUTE AT THE END OF THE FILE ---
+@explore.route('/matrix-calculator/batch', methods=['POST'])
+@login_required
+def matrix_batch():
+    """
+    Runs one operation over a whole worksheet of matrices in a single vectorized call.
+    Body: {"operation": "determinant|inverse|rank|solve|lu|qr|eigenvalues|power",
+           "matrices": [[[...]], ...], "rhs": [...] (solve), "exponent": 3 (power), "exact": false}
+    """
+    data = json_object_body()
+    try:
+        results = compute_batch(data.get('operation'), data.get('matrices'),
+                                rhs=data.get('rhs'), exponent=data.get('exponent'),
+                                exact=bool(data.get('exact', False)))
+    except LinearAlgebraError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'results': results})
+# --- Polynomial roots (quadratics included) come from the vectorized solver in polynomial.py ---
 @explore.route('/quadratic-solver', methods=['GET', 'POST'])
 @login_required
 def quadratic_solver():
@@ -143,22 +177,34 @@ def quadratic_solver():
             if a == 0:
                 return jsonify({'error': 'The coefficient "a" cannot be zero for a quadratic equation.'}), 400
 
-            # Calculate the discriminant
-            discriminant = (b**2) - (4*a*c)
+            # Expand repeated roots so there are always two solutions, smallest real part first
+            roots = [complex(root['real'], root['imag'])
+                     for root in solve_batch([[a, b, c]])[0]['roots']
+                     for _ in range(root['multiplicity'])]
 
-            # Find two solutions
-            sol1 = (-b - cmath.sqrt(discriminant)) / (2 * a)
-            sol2 = (-b + cmath.sqrt(discriminant)) / (2 * a)
-            
             # Format the solutions to be readable strings
             # This handles complex numbers like '3+2j' automatically
             result = {
-                'sol1': str(sol1).replace('j', 'i'),
-                'sol2': str(sol2).replace('j', 'i')
+                'sol1': str(roots[0]).replace('j', 'i'),
+                'sol2': str(roots[1]).replace('j', 'i')
             }
             return jsonify(result)
 
         except Exception as e:
             return jsonify({'error': 'Invalid input. Please enter valid numbers for a, b, and c.'}), 400
             
-    return render_template('quadratic_solver.html')
\ No newline at end of file
+    return render_template('quadratic_solver.html')
+
+@explore.route('/polynomial-solver', methods=['POST'])
+@login_required
+def polynomial_solver():
+    """
+    Solves a batch of polynomials of any degree.
+    Body: {"polynomials": [[1, -3, 2], [2, 0, 0, -16], ...]} (coefficients, highest degree first)
+    """
+    data = json_object_body()
+    try:
+        results = solve_batch(data.get('polynomials'))
+    except PolynomialError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'results': results})
@@ -0,0 +1,150 @@
+# exports.py
+"""
+Admin exports of submissions, quiz attempts and assessment results as CSV or JSON Lines.
+
+Exports are streamed: rows are read in keyset-paginated chunks (WHERE id > last ORDER BY id
+LIMIT n) and each chunk is serialized and sent before the next one is fetched, so memory
+stays constant however large the table is. The transaction is ended between chunks, which
+releases SQLite's read lock and lets the submission flusher keep writing during a long export.
+"""
+import csv
+import io
+import json
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context, abort
+from sqlalchemy import select
+
+from auth import admin_required
+from extensions import db
+from models import User, Problem, Submission, Quiz, QuizAttempt, AssessmentResult
+
+exports = Blueprint('exports', __name__, url_prefix='/admin/export')
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+# query() builds the base SELECT; key is the unique, indexed column used for paging
+Dataset = namedtuple('Dataset', 'query key timestamp class_level')
+
+
+def _submissions_query():
+    return (select(Submission.id, Submission.user_id, User.username, Submission.problem_id,
+                   Problem.title.label('problem_title'), Problem.topic, Submission.submitted_answer,
+                   Submission.result, Submission.timestamp)
+            .outerjoin(User, User.id == Submission.user_id)
+            .outerjoin(Problem, Problem.id == Submission.problem_id))
+
+
+def _quiz_attempts_query():
+    return (select(QuizAttempt.id, QuizAttempt.user_id, User.username, QuizAttempt.quiz_id,
+                   Quiz.title.label('quiz_title'), Quiz.topic, Quiz.class_level, QuizAttempt.score,
+                   QuizAttempt.total_questions, QuizAttempt.passed, QuizAttempt.attempted_at)
+            .outerjoin(User, User.id == QuizAttempt.user_id)
+            .outerjoin(Quiz, Quiz.id == QuizAttempt.quiz_id))
+
+
+def _assessment_results_query():
+    return select(AssessmentResult.id, AssessmentResult.submitted_at, AssessmentResult.name,
+                  AssessmentResult.class_level, AssessmentResult.school, AssessmentResult.register_number,
+                  AssessmentResult.questions_attempted, AssessmentResult.score, AssessmentResult.total_questions)
+
+
+DATASETS = {
+    'submissions': Dataset(_submissions_query, Submission.id, Submission.timestamp, None),
+    'quiz-attempts': Dataset(_quiz_attempts_query, QuizAttempt.id, QuizAttempt.attempted_at, Quiz.class_level),
+    'assessment-results': Dataset(_assessment_results_query, AssessmentResult.id,
+                                  AssessmentResult.submitted_at, AssessmentResult.class_level),
+}
+
+
+class ExportError(ValueError):
+    """Raised for invalid filters; the message is safe to show to users."""
+
+
+def _parse_date(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise ExportError(f'"{name}" must be a date in YYYY-MM-DD format.')
+
+
+def build_filters(dataset, args):
+    """Turns the from/to/class query parameters into WHERE clauses for a dataset."""
+    filters = []
+    if args.get('from'):
+        filters.append(dataset.timestamp >= _parse_date(args['from'], 'from'))
+    if args.get('to'):
+        # Inclusive: everything up to the end of that day
+        filters.append(dataset.timestamp < _parse_date(args['to'], 'to') + timedelta(days=1))
+    if args.get('class'):
+        if dataset.class_level is None:
+            raise ExportError('This dataset cannot be filtered by class.')
+        filters.append(dataset.class_level == args['class'])
+    return filters
+
+
+def iter_rows(dataset, filters, chunk_size):
+    """Yields (column names, rows) chunk by chunk, ending the read transaction after each one."""
+    stmt = dataset.query().where(*filters).order_by(dataset.key).limit(chunk_size)
+    columns = list(stmt.selected_columns.keys())
+    last_key = None
+    while True:
+        page = stmt if last_key is None else stmt.where(dataset.key > last_key)
+        rows = db.session.execute(page).all()
+        db.session.close()
+        if not rows:
+            return
+        yield columns, rows
+        if len(rows) < chunk_size:
+            return
+        last_key = rows[-1][0] # Every dataset selects its key first
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _csv_chunks(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    header_written = False
+    for columns, rows in chunks:
+        if not header_written:
+            writer.writerow(columns)
+            header_written = True
+        writer.writerows([[_plain(value) for value in row] for row in rows])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _jsonl_chunks(chunks):
+    for columns, rows in chunks:
+        yield ''.join(json.dumps({column: _plain(value) for column, value in zip(columns, row)},
+                                 separators=(',', ':')) + '\n'
+                      for row in rows)
+
+
+@exports.route('/<dataset_name>.<fmt>')
+@admin_required
+def export(dataset_name, fmt):
+    dataset = DATASETS.get(dataset_name)
+    if dataset is None or fmt not in FORMATS:
+        abort(404)
+    try:
+        filters = build_filters(dataset, request.args)
+    except ExportError as e:
+        return jsonify({'error': str(e)}), 400
+
+    chunks = iter_rows(dataset, filters, current_app.config['EXPORT_CHUNK_SIZE'])
+    body = _csv_chunks(chunks) if fmt == 'csv' else _jsonl_chunks(chunks)
+    filename = f"{dataset_name}-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}"
+    return Response(stream_with_context(body), content_type=FORMATS[fmt], headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'Cache-Control': 'no-store',
+        'X-Accel-Buffering': 'no', # Don't let a reverse proxy buffer the whole export
+    })
@@ -1,6 +1,12 @@
 # extensions.py
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
+from credentials import CredentialService
+from instrumentation import Instrumentation
+from http_cache import HttpCache
 
 db = SQLAlchemy()
 login_manager = LoginManager()
+credentials = CredentialService()
+instrumentation = Instrumentation()
+http_cache = HttpCache()
@@ -0,0 +1,155 @@
+# http_cache.py
+import gzip
+import hashlib
+import os
+
+from flask import request, url_for, current_app
+from flask_login import current_user
+
+from lru import LRUCache
+
+try:
+    import brotli # Optional: `pip install brotli` enables br encoding
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript', 'application/javascript',
+    'application/json', 'application/xml', 'image/svg+xml',
+}
+
+
+def _negotiate_encoding(accept_encoding):
+    """Picks the best encoding this server supports from the request's Accept-Encoding."""
+    if brotli is not None and accept_encoding['br']:
+        return 'br'
+    if accept_encoding['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compress(data, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+class HttpCache:
+    """
+    Response layer for bandwidth and revalidation:
+      * gzip (or brotli when installed) for text-like responses above COMPRESS_MIN_SIZE bytes;
+      * strong ETags with 304 handling for static files and pages served to anonymous users;
+      * long-lived immutable caching for fingerprinted static URLs built with `static_url()`.
+
+    Configuration keys:
+        COMPRESS_MIN_SIZE        Smallest body (bytes) worth compressing.
+        COMPRESS_LEVEL           gzip level / brotli quality.
+        STATIC_CACHE_MAX_AGE     max-age for static files requested without a fingerprint.
+        FINGERPRINT_MAX_AGE      max-age for fingerprinted static files.
+    """
+
+    def __init__(self, app=None):
+        # Compressed bodies of static files, keyed by (etag, encoding)
+        self.compressed_static = LRUCache(maxsize=64)
+        self._fingerprints = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+        app.config.setdefault('COMPRESS_LEVEL', 6)
+        app.config.setdefault('STATIC_CACHE_MAX_AGE', 3600)
+        app.config.setdefault('FINGERPRINT_MAX_AGE', 31536000)
+        # Flask's static route already sends ETags and answers If-None-Match; give it a max-age too
+        if app.config.get('SEND_FILE_MAX_AGE_DEFAULT') is None:
+            app.config['SEND_FILE_MAX_AGE_DEFAULT'] = app.config['STATIC_CACHE_MAX_AGE']
+
+        app.add_template_global(self.static_url, 'static_url')
+        app.after_request(self._after_request)
+        app.extensions['http_cache'] = self
+
+    def static_url(self, filename):
+        """url_for('static') with a content fingerprint, so the file can be cached for a year."""
+        path = os.path.join(current_app.static_folder, filename)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return url_for('static', filename=filename)
+        cached = self._fingerprints.get(path)
+        if cached is None or cached[0] != mtime:
+            digest = hashlib.md5()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(65536), b''):
+                    digest.update(chunk)
+            cached = (mtime, digest.hexdigest()[:12])
+            self._fingerprints[path] = cached
+        return url_for('static', filename=filename, v=cached[1])
+
+    def _after_request(self, response):
+        if request.method not in ('GET', 'HEAD') or response.status_code != 200:
+            return response
+        # Generator responses (exports) stream as-is; file responses are streamed too but can be buffered
+        if response.is_streamed and not response.direct_passthrough:
+            return response
+
+        is_static = request.endpoint == 'static'
+        if is_static and request.args.get('v'):
+            response.cache_control.public = True
+            response.cache_control.max_age = current_app.config['FINGERPRINT_MAX_AGE']
+            response.cache_control.immutable = True
+
+        compressible = response.mimetype in COMPRESSIBLE_MIMETYPES and 'Content-Encoding' not in response.headers
+        if compressible:
+            response.vary.add('Accept-Encoding')
+
+        # Pages are personalised for logged-in users, so only anonymous ones get ETags
+        cacheable_page = (not is_static and response.mimetype == 'text/html'
+                          and 'Set-Cookie' not in response.headers and not current_user.is_authenticated)
+        if cacheable_page:
+            response.add_etag()
+            response.cache_control.no_cache = True
+            response.vary.add('Cookie')
+
+        encoding = None
+        if compressible and not response.cache_control.no_transform:
+            length = response.content_length
+            if length is None or length >= current_app.config['COMPRESS_MIN_SIZE']:
+                encoding = _negotiate_encoding(request.accept_encodings)
+
+        etag, weak = response.get_etag()
+        base_etag = etag
+        if encoding and etag:
+            # Each encoding is a different representation and needs its own strong ETag
+            etag = f"{etag}-{encoding}"
+            response.set_etag(etag, weak=bool(weak))
+        if etag:
+            response.make_conditional(request)
+            if response.status_code == 304:
+                return response
+
+        if encoding and not self._compress_response(response, encoding, is_static, etag) and base_etag:
+            # Left uncompressed (too small or incompressible), so it keeps the identity ETag
+            response.set_etag(base_etag, weak=bool(weak))
+        return response
+
+    def _compress_response(self, response, encoding, is_static, etag):
+        """Swaps the body for its compressed form; returns False when compression is not worth it."""
+        cache_key = (etag, encoding) if is_static and etag else None
+        body = self.compressed_static.get(cache_key) if cache_key else None
+        original = response.response
+        response.direct_passthrough = False
+        if body is None:
+            data = response.get_data()
+            if len(data) < current_app.config['COMPRESS_MIN_SIZE']:
+                return False
+            body = _compress(data, encoding, current_app.config['COMPRESS_LEVEL'])
+            if len(body) >= len(data):
+                return False
+            if cache_key:
+                self.compressed_static.set(cache_key, body)
+        # Release the file handle of send_file responses before swapping in the compressed body
+        if hasattr(original, 'close'):
+            original.close()
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        return True
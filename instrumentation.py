@@ -0,0 +1,222 @@
+# instrumentation.py
+import bisect
+import cProfile
+import hmac
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+
+from flask import Blueprint, current_app, g, has_request_context, jsonify, request, abort
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Upper bounds (in milliseconds) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+metrics = Blueprint('metrics', __name__)
+
+
+def _normalize_statement(statement):
+    """Collapses literals and whitespace so statements that differ only by their values group together."""
+    statement = re.sub(r"'(?:[^']|'')*'", '?', statement)
+    statement = re.sub(r'\b\d+(?:\.\d+)?\b', '?', statement)
+    statement = re.sub(r'\(\s*\?(?:\s*,\s*\?)*\s*\)', '(?)', statement)
+    return ' '.join(statement.split())
+
+
+class EndpointStats:
+    """Aggregated latency and SQL figures for one endpoint."""
+
+    def __init__(self):
+        self.requests = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.queries = 0
+        self.query_ms = 0.0
+        self.max_queries = 0
+        self.n_plus_one = 0
+
+    def record(self, elapsed_ms, query_count, query_ms, n_plus_one):
+        self.requests += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        self.queries += query_count
+        self.query_ms += query_ms
+        self.max_queries = max(self.max_queries, query_count)
+        if n_plus_one:
+            self.n_plus_one += 1
+
+    def percentile(self, pct):
+        """Approximates a latency percentile from the histogram (upper bound of the bucket)."""
+        if not self.requests:
+            return 0.0
+        rank = pct / 100.0 * self.requests
+        seen = 0
+        for upper, count in zip(LATENCY_BUCKETS_MS + (None,), self.buckets):
+            seen += count
+            if seen >= rank:
+                return float(upper) if upper is not None else self.max_ms
+        return self.max_ms
+
+    def to_dict(self):
+        return {
+            'requests': self.requests,
+            'avg_ms': round(self.total_ms / self.requests, 2) if self.requests else 0.0,
+            'max_ms': round(self.max_ms, 2),
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            # [upper bound in ms (None = open-ended), count] pairs, in bucket order
+            'histogram': [[upper, count] for upper, count in zip(LATENCY_BUCKETS_MS + (None,), self.buckets)],
+            'queries': self.queries,
+            'avg_queries': round(self.queries / self.requests, 2) if self.requests else 0.0,
+            'max_queries': self.max_queries,
+            'query_ms': round(self.query_ms, 2),
+            'n_plus_one_requests': self.n_plus_one,
+        }
+
+
+class Instrumentation:
+    """
+    Opt-in request profiling: per-endpoint latency histograms, SQL counts/durations per
+    request, N+1 detection and sampled cProfile dumps. Figures are per worker process.
+
+    Configuration keys:
+        INSTRUMENTATION_ENABLED          Turns the whole layer on.
+        INSTRUMENTATION_N_PLUS_ONE_THRESHOLD  Repeats of one normalized statement in a request that count as N+1.
+        INSTRUMENTATION_PROFILE_SAMPLE_RATE   Fraction of requests to run under cProfile (0 disables).
+        INSTRUMENTATION_PROFILE_DIR      Where sampled .prof files are written.
+        METRICS_TOKEN                    Token required by /metrics (X-Metrics-Token header or ?token=).
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self.endpoints = {}
+        self.n_plus_one_samples = {}
+        self.n_plus_one_threshold = 10
+        self.profile_sample_rate = 0.0
+        self.profile_dir = None
+        self._listening = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('INSTRUMENTATION_ENABLED', False)
+        app.config.setdefault('INSTRUMENTATION_N_PLUS_ONE_THRESHOLD', 10)
+        app.config.setdefault('INSTRUMENTATION_PROFILE_SAMPLE_RATE', 0.0)
+        app.config.setdefault('INSTRUMENTATION_PROFILE_DIR', os.path.join(app.instance_path, 'profiles'))
+        app.config.setdefault('METRICS_TOKEN', None)
+        app.extensions['instrumentation'] = self
+
+        if not app.config['INSTRUMENTATION_ENABLED']:
+            return
+
+        self.n_plus_one_threshold = app.config['INSTRUMENTATION_N_PLUS_ONE_THRESHOLD']
+        self.profile_sample_rate = app.config['INSTRUMENTATION_PROFILE_SAMPLE_RATE']
+        self.profile_dir = app.config['INSTRUMENTATION_PROFILE_DIR']
+
+        if not self._listening:
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            self._listening = True
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.register_blueprint(metrics)
+
+    # --- SQL tracking ---
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'instr_queries' in g:
+            conn.info.setdefault('instr_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not (has_request_context() and 'instr_queries' in g):
+            return
+        starts = conn.info.get('instr_start')
+        elapsed_ms = (time.perf_counter() - starts.pop()) * 1000 if starts else 0.0
+        g.instr_queries[_normalize_statement(statement)] += 1
+        g.instr_query_ms += elapsed_ms
+
+    # --- Request hooks ---
+    def _before_request(self):
+        g.instr_start = time.perf_counter()
+        g.instr_queries = Counter()
+        g.instr_query_ms = 0.0
+        g.instr_profiler = None
+        if self.profile_sample_rate and random.random() < self.profile_sample_rate:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                g.instr_profiler = profiler
+            except ValueError:
+                # Another profiler is already active in this thread
+                pass
+
+    def _after_request(self, response):
+        if 'instr_start' not in g:
+            return response
+        elapsed_ms = (time.perf_counter() - g.instr_start) * 1000
+        endpoint = request.endpoint or '<unmatched>'
+        query_count = sum(g.instr_queries.values())
+
+        repeated = [(stmt, count) for stmt, count in g.instr_queries.items() if count >= self.n_plus_one_threshold]
+        for stmt, count in repeated:
+            current_app.logger.warning("Possible N+1 in %s: %d x %s", endpoint, count, stmt[:200])
+
+        with self._lock:
+            stats = self.endpoints.setdefault(endpoint, EndpointStats())
+            stats.record(elapsed_ms, query_count, g.instr_query_ms, bool(repeated))
+            for stmt, count in repeated:
+                samples = self.n_plus_one_samples.setdefault(endpoint, {})
+                samples[stmt] = max(samples.get(stmt, 0), count)
+
+        response.headers['Server-Timing'] = f"app;dur={elapsed_ms:.1f}, db;dur={g.instr_query_ms:.1f};desc=\"{query_count} queries\""
+        return response
+
+    def _teardown_request(self, exc):
+        profiler = g.pop('instr_profiler', None)
+        if profiler is None:
+            return
+        profiler.disable()
+        os.makedirs(self.profile_dir, exist_ok=True)
+        endpoint = (request.endpoint or 'unmatched').replace('.', '_')
+        filename = f"{endpoint}-{int(time.time() * 1000)}-{os.getpid()}.prof"
+        profiler.dump_stats(os.path.join(self.profile_dir, filename))
+
+    def snapshot(self):
+        """Returns the aggregated figures as plain dicts."""
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'endpoints': {name: stats.to_dict() for name, stats in sorted(self.endpoints.items())},
+                'n_plus_one': {name: dict(samples) for name, samples in self.n_plus_one_samples.items()},
+            }
+
+    def reset(self):
+        with self._lock:
+            self.endpoints.clear()
+            self.n_plus_one_samples.clear()
+
+
+@metrics.route('/metrics')
+def show_metrics():
+    """Aggregated request/SQL figures for this worker, guarded by METRICS_TOKEN."""
+    token = current_app.config.get('METRICS_TOKEN')
+    supplied = request.headers.get('X-Metrics-Token') or request.args.get('token') or ''
+    # Compare bytes: compare_digest raises TypeError for str holding non-ASCII characters.
+    # str() because FLASK_METRICS_TOKEN=12345 is parsed as JSON into an int
+    if not token or not hmac.compare_digest(supplied.encode(), str(token).encode()):
+        abort(404)
+    instrumentation = current_app.extensions['instrumentation']
+    data = instrumentation.snapshot()
+    if 'cache' in current_app.extensions:
+        data['cache'] = current_app.extensions['cache'].stats()
+    if request.args.get('reset') == '1':
+        instrumentation.reset()
+    return jsonify(data)
@@ -1,14 +1,26 @@
+from collections import namedtuple
 from flask import Blueprint, render_template
 from flask_login import login_required
+from sqlalchemy import select
 from models import User # Import the User model
 from extensions import db
+from cache import cache
 
 leaderboard = Blueprint('leaderboard', __name__)
 
+# What the leaderboard shows of a user; cached rows are shared by every worker
+LeaderboardEntry = namedtuple('LeaderboardEntry', 'id username score solved_problems_count')
+
+def leaderboard_snapshot():
+    rows = db.session.execute(
+        select(User.id, User.username, User.score, User.solved_problems_count).order_by(User.score.desc())
+    ).all()
+    return [LeaderboardEntry(*row) for row in rows]
+
 @leaderboard.route('/leaderboard')
 @login_required
 def show_leaderboard():
     # Fetch all users, ordered by their score in descending order
-    # You can limit the number of users displayed, e.g., .limit(10)
-    top_users = User.query.order_by(User.score.desc()).all()
+    # The snapshot is cached until a score changes (invalidated by the 'leaderboard' hooks in cache.py)
+    top_users = cache.get_or_set('leaderboard', 'all', leaderboard_snapshot)
     return render_template('leaderboard.html', users=top_users)
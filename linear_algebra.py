@@ -0,0 +1,300 @@
+# linear_algebra.py
+"""
+Batched linear algebra for the matrix calculator.
+
+A request carries a list of matrices (a worksheet); matrices of the same shape are stacked
+into one (k, n, m) NumPy array and handled by a single vectorized call. Small integer
+matrices can also be computed exactly with Fractions.
+"""
+import math
+from fractions import Fraction
+
+import numpy as np
+
+MAX_BATCH = 500 # Matrices per request
+MAX_DIM = 20 # Rows/columns per matrix
+MAX_COST = 4_000_000 # Sum of n^3 (times log2 of the exponent for powers) per request
+MAX_EXPONENT = 1000
+EXACT_MAX_DIM = 6 # Exact (rational) mode is limited to small matrices
+MAX_EXACT_BITS = 8000 # Per numerator/denominator in exact results (~2400 digits, below Python's str() limit)
+SINGULAR_TOL = 1e-12
+
+OPERATIONS = ('determinant', 'inverse', 'rank', 'solve', 'lu', 'qr', 'eigenvalues', 'power')
+EXACT_OPERATIONS = ('determinant', 'inverse', 'rank', 'solve', 'power')
+
+
+class LinearAlgebraError(ValueError):
+    """Raised for requests that cannot be computed; the message is safe to show to users."""
+
+
+# --- Input handling ---
+def _to_array(matrix, index):
+    try:
+        array = np.array(matrix, dtype=float)
+    except (TypeError, ValueError, OverflowError):
+        raise LinearAlgebraError(f'Matrix {index + 1} must be a rectangular grid of numbers.')
+    if array.ndim != 2 or 0 in array.shape:
+        raise LinearAlgebraError(f'Matrix {index + 1} must be a non-empty 2-D matrix.')
+    if max(array.shape) > MAX_DIM:
+        raise LinearAlgebraError(f'Matrix {index + 1} is larger than {MAX_DIM}x{MAX_DIM}.')
+    if not np.all(np.isfinite(array)):
+        raise LinearAlgebraError(f'Matrix {index + 1} contains non-finite values.')
+    return array
+
+
+def _group(keys):
+    """Maps each distinct key to the list of positions where it occurs, preserving order."""
+    groups = {}
+    for position, key in enumerate(keys):
+        groups.setdefault(key, []).append(position)
+    return groups
+
+
+def _round(array):
+    return np.round(array, 10) + 0.0 # + 0.0 turns -0.0 into 0.0
+
+
+def _is_finite(value):
+    if isinstance(value, dict):
+        return all(_is_finite(item) for item in value.values())
+    return bool(np.all(np.isfinite(np.asarray(value, dtype=float))))
+
+
+def _complex_list(values):
+    values = np.asarray(values)
+    return {'real': _round(values.real).tolist(), 'imag': _round(values.imag).tolist()}
+
+
+# --- Vectorized kernels (each takes a (k, n, m) stack) ---
+def batched_lu(stack):
+    """LU decomposition with partial pivoting for a stack of square matrices: P @ A = L @ U."""
+    k, n, _ = stack.shape
+    upper = stack.copy()
+    lower = np.zeros_like(stack)
+    perm = np.tile(np.arange(n), (k, 1))
+    batch = np.arange(k)
+    for col in range(n):
+        pivot = col + np.abs(upper[:, col:, col]).argmax(axis=1)
+        # Swap the pivot row into place in U, the already-built part of L and the permutation
+        for array in (upper, lower):
+            rows_col, rows_pivot = array[batch, col].copy(), array[batch, pivot].copy()
+            array[batch, col], array[batch, pivot] = rows_pivot, rows_col
+        perm[batch, col], perm[batch, pivot] = perm[batch, pivot], perm[batch, col].copy()
+
+        diag = upper[:, col, col]
+        safe = np.where(np.abs(diag) > SINGULAR_TOL, diag, 1.0)
+        factors = np.where(np.abs(diag)[:, None] > SINGULAR_TOL, upper[:, col + 1:, col] / safe[:, None], 0.0)
+        lower[:, col + 1:, col] = factors
+        upper[:, col + 1:, :] -= factors[:, :, None] * upper[:, col, None, :]
+    lower += np.eye(n)
+    permutation = np.zeros_like(stack)
+    permutation[batch[:, None], np.arange(n)[None, :], perm] = 1.0
+    return permutation, lower, np.triu(upper)
+
+
+def _singular_mask(stack):
+    return np.linalg.matrix_rank(stack) < stack.shape[-1]
+
+
+def _numeric(operation, stack, extra):
+    """Runs one operation on a same-shape stack; returns one result (or error dict) per matrix."""
+    k, n, m = stack.shape
+    if operation in ('determinant', 'inverse', 'solve', 'lu', 'eigenvalues', 'power') and n != m:
+        return [{'error': f'{operation.capitalize()} needs a square matrix.'}] * k
+
+    if operation == 'determinant':
+        return [{'determinant': value} for value in _round(np.linalg.det(stack)).tolist()]
+    if operation == 'rank':
+        return [{'rank': int(value)} for value in np.linalg.matrix_rank(stack)]
+    if operation == 'eigenvalues':
+        return [{'eigenvalues': _complex_list(values)} for values in np.linalg.eigvals(stack)]
+    if operation == 'qr':
+        q, r = np.linalg.qr(stack)
+        return [{'q': _round(qi).tolist(), 'r': _round(ri).tolist()} for qi, ri in zip(q, r)]
+    if operation == 'lu':
+        p, l, u = batched_lu(stack)
+        return [{'p': pi.astype(int).tolist(), 'l': _round(li).tolist(), 'u': _round(ui).tolist()}
+                for pi, li, ui in zip(p, l, u)]
+
+    results = [{'error': 'Matrix is singular.'}] * k
+    if operation == 'power' and extra >= 0:
+        return [{'result': _round(value).tolist()} for value in np.linalg.matrix_power(stack, extra)]
+
+    # inverse, solve and negative powers need invertible matrices; handle the rest in one call
+    regular = np.flatnonzero(~_singular_mask(stack))
+    if not regular.size:
+        return results
+    results = list(results)
+    if operation == 'inverse':
+        values = np.linalg.inv(stack[regular])
+    elif operation == 'power':
+        values = np.linalg.matrix_power(np.linalg.inv(stack[regular]), -extra)
+    else:
+        rhs = extra[regular]
+        vector = rhs.ndim == 2
+        values = np.linalg.solve(stack[regular], rhs[..., None] if vector else rhs)
+        if vector:
+            values = values[..., 0]
+    for position, value in zip(regular, values):
+        results[position] = {'result': _round(value).tolist()}
+    return results
+
+
+# --- Exact (rational) mode ---
+def _format_fraction(value):
+    return value.numerator if value.denominator == 1 else f'{value.numerator}/{value.denominator}'
+
+
+def _format_exact(rows):
+    return [[_format_fraction(value) for value in row] for row in rows]
+
+
+def _row_reduce(rows, augment=None):
+    """Gauss-Jordan elimination over Fractions. Returns (reduced rows, augment, rank, det)."""
+    rows = [list(row) for row in rows]
+    augment = [list(row) for row in augment] if augment is not None else None
+    n_rows, n_cols = len(rows), len(rows[0])
+    det, rank = Fraction(1), 0
+    for col in range(n_cols):
+        pivot = next((r for r in range(rank, n_rows) if rows[r][col] != 0), None)
+        if pivot is None:
+            det = Fraction(0)
+            continue
+        if pivot != rank:
+            rows[rank], rows[pivot] = rows[pivot], rows[rank]
+            if augment is not None:
+                augment[rank], augment[pivot] = augment[pivot], augment[rank]
+            det = -det
+        pivot_value = rows[rank][col]
+        det *= pivot_value
+        rows[rank] = [value / pivot_value for value in rows[rank]]
+        if augment is not None:
+            augment[rank] = [value / pivot_value for value in augment[rank]]
+        for r in range(n_rows):
+            if r != rank and rows[r][col] != 0:
+                factor = rows[r][col]
+                rows[r] = [a - factor * b for a, b in zip(rows[r], rows[rank])]
+                if augment is not None:
+                    augment[r] = [a - factor * b for a, b in zip(augment[r], augment[rank])]
+        rank += 1
+        if rank == n_rows:
+            break
+    if rank < n_cols:
+        det = Fraction(0)
+    return rows, augment, rank, det
+
+
+def _mat_mul(a, b):
+    return [[sum(x * y for x, y in zip(row, col)) for col in zip(*b)] for row in a]
+
+
+def _too_large(rows):
+    return any(value.numerator.bit_length() > MAX_EXACT_BITS or value.denominator.bit_length() > MAX_EXACT_BITS
+               for row in rows for value in row)
+
+
+def _exact(operation, matrix, extra):
+    rows = [[Fraction(int(value)) for value in row] for row in matrix]
+    n, m = len(rows), len(rows[0])
+    if operation != 'rank' and n != m:
+        return {'error': f'{operation.capitalize()} needs a square matrix.'}
+    if operation == 'rank':
+        return {'rank': _row_reduce(rows)[2]}
+    if operation == 'determinant':
+        return {'determinant': _format_fraction(_row_reduce(rows)[3])}
+
+    identity = [[Fraction(int(i == j)) for j in range(n)] for i in range(n)]
+    if operation == 'power' and extra >= 0:
+        result, base, exponent = identity, rows, extra
+    else:
+        if operation == 'solve':
+            vector = np.ndim(extra) == 1
+            rhs = [[Fraction(value)] for value in extra] if vector else [[Fraction(v) for v in row] for row in extra]
+        else:
+            rhs = identity
+        _, solved, rank, _ = _row_reduce(rows, rhs)
+        if rank < n:
+            return {'error': 'Matrix is singular.'}
+        if operation == 'inverse':
+            return {'result': _format_exact(solved)}
+        if operation == 'solve':
+            return {'result': [_format_fraction(row[0]) for row in solved] if vector else _format_exact(solved)}
+        result, base, exponent = identity, solved, -extra
+    while exponent:
+        if exponent & 1:
+            result = _mat_mul(result, base)
+        exponent >>= 1
+        if exponent:
+            base = _mat_mul(base, base) # Still a power no higher than the one asked for
+        if _too_large(result) or _too_large(base):
+            return {'error': 'Result is too large for exact mode; use numeric mode.'}
+    return {'result': _format_exact(result)}
+
+
+def _is_small_integer(array):
+    return max(array.shape) <= EXACT_MAX_DIM and np.all(array == np.round(array)) and np.all(np.abs(array) < 1e9)
+
+
+# --- Entry point ---
+def compute_batch(operation, matrices, rhs=None, exponent=None, exact=False):
+    """
+    Applies `operation` to every matrix in `matrices` and returns results in input order.
+    Per-matrix problems (e.g. a singular matrix) are reported as {'error': ...} entries;
+    invalid requests raise LinearAlgebraError.
+    """
+    if operation not in OPERATIONS:
+        raise LinearAlgebraError(f"Unknown operation. Choose one of: {', '.join(OPERATIONS)}.")
+    if not isinstance(matrices, list) or not matrices:
+        raise LinearAlgebraError('Provide a non-empty list of matrices.')
+    if len(matrices) > MAX_BATCH:
+        raise LinearAlgebraError(f'At most {MAX_BATCH} matrices can be computed per request.')
+    arrays = [_to_array(matrix, index) for index, matrix in enumerate(matrices)]
+
+    power = 0
+    if operation == 'power':
+        try:
+            power = int(exponent)
+        except (TypeError, ValueError, OverflowError):
+            raise LinearAlgebraError('Power needs an integer "exponent".')
+        if abs(power) > MAX_EXPONENT:
+            raise LinearAlgebraError(f'Exponent must be between -{MAX_EXPONENT} and {MAX_EXPONENT}.')
+
+    rhs_arrays = [None] * len(arrays)
+    if operation == 'solve':
+        if not isinstance(rhs, list) or len(rhs) != len(arrays):
+            raise LinearAlgebraError('Solve needs one right-hand side in "rhs" per matrix.')
+        for index, (array, b) in enumerate(zip(arrays, rhs)):
+            try:
+                b = np.array(b, dtype=float)
+            except (TypeError, ValueError, OverflowError):
+                raise LinearAlgebraError(f'Right-hand side {index + 1} must contain numbers.')
+            if b.ndim not in (1, 2) or b.shape[0] != array.shape[0] or not np.all(np.isfinite(b)):
+                raise LinearAlgebraError(f'Right-hand side {index + 1} must have {array.shape[0]} rows.')
+            rhs_arrays[index] = b
+
+    cost_factor = max(1.0, math.log2(abs(power) + 1)) if operation == 'power' else 1.0
+    cost = sum(max(array.shape) ** 3 for array in arrays) * cost_factor
+    if cost > MAX_COST:
+        raise LinearAlgebraError('This batch is too expensive to compute in one request. Split it into smaller batches.')
+
+    if exact:
+        if operation not in EXACT_OPERATIONS:
+            raise LinearAlgebraError(f"Exact mode supports: {', '.join(EXACT_OPERATIONS)}.")
+        if not all(_is_small_integer(array) for array in arrays) or \
+           (operation == 'solve' and not all(np.all(b == np.round(b)) for b in rhs_arrays)):
+            raise LinearAlgebraError(f'Exact mode needs integer matrices up to {EXACT_MAX_DIM}x{EXACT_MAX_DIM}.')
+        return [_exact(operation, array.astype(int).tolist(), b.astype(int).tolist() if b is not None else power)
+                for array, b in zip(arrays, rhs_arrays)]
+
+    results = [None] * len(arrays)
+    keys = [(array.shape, b.shape if b is not None else None) for array, b in zip(arrays, rhs_arrays)]
+    for key, positions in _group(keys).items():
+        stack = np.stack([arrays[p] for p in positions])
+        extra = np.stack([rhs_arrays[p] for p in positions]) if operation == 'solve' else power
+        with np.errstate(over='ignore', invalid='ignore'):
+            group_results = _numeric(operation, stack, extra)
+        for position, result in zip(positions, group_results):
+            # Overflow gives Infinity/NaN, which JSON cannot carry
+            results[position] = result if 'error' in result or _is_finite(result) else \
+                {'error': 'Result is too large to represent.'}
+    return results
@@ -44,10 +44,48 @@ class Submission(db.Model):
     submitted_answer = db.Column(db.String(100), nullable=False) # Store the user's direct answer
     result = db.Column(db.String(100), nullable=False) # e.g., "Accepted", "Wrong Answer", "Error"
     timestamp = db.Column(db.DateTime, default=datetime.utcnow) # Use datetime.utcnow for timezone-aware timestamps
+    # "Which problems has this user solved" (first-solve checks, recommendations) without a table scan
+    __table_args__ = (db.Index('ix_submission_user_result_problem', 'user_id', 'result', 'problem_id'),)
 
     def __repr__(self):
         return f"<Submission {self.id} by User {self.user_id} for Problem {self.problem_id}>"
 
+class ProblemStats(db.Model):
+    # Per-problem aggregates, updated with every submission batch (see problem_stats.py)
+    __tablename__ = 'problem_stats'
+    problem_id = db.Column(db.Integer, db.ForeignKey('problem.id'), primary_key=True)
+    attempt_count = db.Column(db.Integer, nullable=False, default=0)
+    accepted_count = db.Column(db.Integer, nullable=False, default=0)
+    solver_count = db.Column(db.Integer, nullable=False, default=0) # Distinct users with an accepted answer
+
+    @property
+    def acceptance_rate(self):
+        return self.accepted_count / self.attempt_count if self.attempt_count else 0.0
+
+    def __repr__(self):
+        return f"<ProblemStats {self.problem_id}: {self.accepted_count}/{self.attempt_count}>"
+
+class TopicMastery(db.Model):
+    # Per-user, per-topic submission outcomes weighted by difficulty (see recommendations.py)
+    __tablename__ = 'topic_mastery'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    topic = db.Column(db.String(50), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    weighted_attempts = db.Column(db.Float, nullable=False, default=0.0) # Sum of difficulty_level over attempts
+    weighted_accepted = db.Column(db.Float, nullable=False, default=0.0) # ... over accepted attempts
+
+    def __repr__(self):
+        return f"<TopicMastery User:{self.user_id} {self.topic}: {self.weighted_accepted}/{self.weighted_attempts}>"
+
+class SubmissionLogCheckpoint(db.Model):
+    # Highest sequence number of a write-behind submission log already committed (see submission_buffer.py)
+    __tablename__ = 'submission_log_checkpoint'
+    log_name = db.Column(db.String(100), primary_key=True)
+    last_seq = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<SubmissionLogCheckpoint {self.log_name}@{self.last_seq}>"
+
 # --- Models for "Explore" (Videos) ---
 class Video(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -103,6 +141,36 @@ class QuizAttempt(db.Model):
     def __repr__(self):
         return f"<QuizAttempt User:{self.user_id} Quiz:{self.quiz_id} Score:{self.score}/{self.total_questions}>"
 
+# --- Models for "Assessment" (also mirrored to the Google Sheet) ---
+class AssessmentResult(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    class_level = db.Column(db.String(20), nullable=False, index=True)
+    school = db.Column(db.String(200), nullable=True)
+    register_number = db.Column(db.String(50), nullable=True)
+    questions_attempted = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Integer, nullable=False)
+    total_questions = db.Column(db.Integer, nullable=False)
+    submitted_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"<AssessmentResult {self.name} ({self.class_level}) Score:{self.score}/{self.total_questions}>"
+
+class PerformanceRollup(db.Model):
+    # Pre-aggregated quiz/assessment results per day, source, topic, class level and score bin (see analytics.py)
+    __tablename__ = 'performance_rollup'
+    day = db.Column(db.Date, primary_key=True)
+    source = db.Column(db.String(20), primary_key=True) # 'quiz' or 'assessment'
+    topic = db.Column(db.String(50), primary_key=True)
+    class_level = db.Column(db.String(20), primary_key=True)
+    score_bin = db.Column(db.Integer, primary_key=True) # Score percentage // 10 (100% goes into bin 9)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    passed = db.Column(db.Integer, nullable=False, default=0)
+    score_pct_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f"<PerformanceRollup {self.day} {self.source} {self.topic}/{self.class_level} bin {self.score_bin}: {self.attempts}>"
+
 # --- Models for "Discuss/Reviews" (Forum Posts) ---
 class Post(db.Model):
     id = db.Column(db.Integer, primary_key=True)
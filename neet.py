@@ -1,6 +1,8 @@
 # neet.py
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, jsonify
 from flask_login import login_required
+from projectile import compute_batch, ProjectileError
+from api import json_object_body
 
 neet = Blueprint('neet', __name__)
 
@@ -15,4 +17,21 @@ def portal_home():
 def projectile_motion():
     """Renders the Projectile Motion simulator page."""
     # Note: We are now rendering the file renamed to 'projectile_motion_simulator.html'
-    return render_template('projectile_motion_simulator.html')
\ No newline at end of file
+    return render_template('projectile_motion_simulator.html')
+
+@neet.route('/neet/physics/projectile-motion/trajectories', methods=['POST'])
+@login_required
+def projectile_trajectories():
+    """
+    Computes a batch of trajectories in one call.
+    Body: {"params": [{"velocity": 20, "angle": 45, "height": 0, "g": 9.8, "drag": 0}, ...],
+           "samples": 50, "include_path": true}
+    """
+    data = json_object_body()
+    try:
+        results = compute_batch(data.get('params'),
+                                samples=data.get('samples', 50),
+                                include_path=bool(data.get('include_path', True)))
+    except ProjectileError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'results': results})
@@ -0,0 +1,226 @@
+# polynomial.py
+"""
+Vectorized polynomial root finding.
+
+Polynomials are given as coefficient lists, highest degree first (the numpy.roots
+convention). Polynomials of equal degree are solved together: their companion matrices
+are stacked into one (k, d, d) array and passed to a single eigenvalue call. Quadratics
+use the numerically stable closed form instead.
+"""
+import numpy as np
+
+from lru import LRUCache
+
+MAX_BATCH = 5000 # Polynomials per request
+MAX_DEGREE = 50
+MAX_COST = 20_000_000 # Sum of degree^3 (the eigenvalue work) per request
+REAL_TOL = 1e-9 # Relative size of an imaginary part still treated as rounding noise
+REPEAT_TOL = 1e-7 # Relative residual of p, p', ... accepted when confirming a repeated root
+MIN_CLUSTER_TOL = 1e-12 # Groups that still fail the repeated-root check at this distance are simple roots
+
+# Solutions per normalized coefficient tuple
+_solutions_cache = LRUCache(maxsize=10000)
+
+
+class PolynomialError(ValueError):
+    """Raised for invalid input; the message is safe to show to users."""
+
+
+def _normalize(coefficients, index):
+    """Validates one coefficient list and strips leading zeros; returns a tuple of floats."""
+    try:
+        values = [float(value) for value in coefficients]
+    except (TypeError, ValueError, OverflowError):
+        raise PolynomialError(f'Polynomial {index + 1} must be a list of numbers.')
+    if not all(np.isfinite(values)):
+        raise PolynomialError(f'Polynomial {index + 1} contains non-finite coefficients.')
+    while values and values[0] == 0:
+        values.pop(0)
+    if len(values) - 1 > MAX_DEGREE:
+        raise PolynomialError(f'Polynomial {index + 1} has degree above {MAX_DEGREE}.')
+    return tuple(values)
+
+
+def _quadratic_roots(coefficients):
+    """Closed-form roots for a (k, 3) array, avoiding cancellation when b^2 >> 4ac."""
+    a, b, c = (coefficients[:, i].astype(complex) for i in range(3))
+    root_disc = np.sqrt(b * b - 4 * a * c)
+    sign = np.where(b.real >= 0, 1.0, -1.0)
+    q = -0.5 * (b + sign * root_disc)
+    safe_q = np.where(q == 0, 1.0, q)
+    first = q / a
+    second = np.where(q == 0, 0.0, c / safe_q)
+    return np.stack([first, second], axis=1)
+
+
+def _companion_roots(coefficients):
+    """Eigenvalues of the stacked companion matrices for a (k, d+1) array of coefficients."""
+    k, d = coefficients.shape[0], coefficients.shape[1] - 1
+    monic = coefficients[:, 1:] / coefficients[:, :1]
+    companion = np.zeros((k, d, d))
+    companion[:, 0, :] = -monic
+    companion[:, np.arange(1, d), np.arange(d - 1)] = 1.0
+    # A leading coefficient tiny next to the others overflows; those rows get NaN roots (reported as errors)
+    finite = np.all(np.isfinite(monic), axis=1)
+    roots = np.full((k, d), np.nan, dtype=complex)
+    if finite.any():
+        roots[finite] = np.linalg.eigvals(companion[finite])
+    return roots
+
+
+def _is_root_of_multiplicity(coefficients, x, multiplicity):
+    """Checks that p and its first multiplicity-1 derivatives all vanish (relatively) at x."""
+    poly = np.asarray(coefficients, dtype=float)
+    for _ in range(multiplicity):
+        size = np.sum(np.abs(poly) * max(1.0, abs(x)) ** np.arange(len(poly) - 1, -1, -1))
+        if abs(np.polyval(poly, x)) > REPEAT_TOL * size:
+            return False
+        poly = np.polyder(poly)
+    return True
+
+
+def _cluster_tol(degree):
+    # An m-fold root comes back split by about eps**(1/m), so clustering has to be generous
+    return 10 * np.finfo(float).eps ** (1.0 / degree)
+
+
+def _has_close_roots(roots, degree):
+    """For a (k, d) array of roots, flags the rows where two roots may be one repeated root."""
+    if degree < 2:
+        return np.zeros(roots.shape[0], dtype=bool)
+    distance = np.abs(roots[:, :, None] - roots[:, None, :])
+    distance[:, np.arange(degree), np.arange(degree)] = np.inf
+    scale = np.maximum(1.0, np.abs(roots))[:, :, None]
+    return np.any(distance <= _cluster_tol(degree) * scale, axis=(1, 2))
+
+
+def _linked_groups(roots, tol):
+    """Single-linkage groups: roots closer than tol (relative to their size) end up together."""
+    scale = np.maximum(1.0, np.abs(roots))
+    near = np.abs(roots[:, None] - roots[None, :]) <= tol * np.maximum(scale[:, None], scale[None, :])
+    unvisited, groups = set(range(len(roots))), []
+    while unvisited:
+        stack = [unvisited.pop()]
+        group = []
+        while stack:
+            i = stack.pop()
+            group.append(i)
+            linked = [j for j in np.flatnonzero(near[i]) if j in unvisited]
+            unvisited.difference_update(linked)
+            stack.extend(linked)
+        groups.append(roots[sorted(group)])
+    return groups
+
+
+def _clusters(coefficients, roots, tol):
+    """
+    Groups roots into (centre, multiplicity) pairs. A group is kept only if the polynomial
+    really has a multiple root at its centre; otherwise it is split again at a quarter of the
+    tolerance, so separate nearby roots are not merged with (or hide) a true repeated root.
+    """
+    distinct = []
+    for group in _linked_groups(roots, tol):
+        centre = complex(np.mean(group))
+        if len(group) == 1:
+            distinct.append((centre, 1))
+        elif _is_root_of_multiplicity(coefficients, centre, len(group)):
+            # A confirmed repeated root split into a near-conjugate pair is real
+            if abs(centre.imag) <= np.max(np.abs(group - centre)):
+                centre = complex(centre.real, 0.0)
+            distinct.append((centre, len(group)))
+        elif tol > MIN_CLUSTER_TOL:
+            distinct.extend(_clusters(coefficients, group, tol / 4))
+        else:
+            distinct.extend((complex(root), 1) for root in group)
+    return distinct
+
+
+def _describe(coefficients, roots, check_repeats=True):
+    """Turns raw roots into distinct roots with multiplicities and a real/complex breakdown."""
+    degree = len(coefficients) - 1
+    roots = np.asarray(roots, dtype=complex)
+    if not check_repeats:
+        return _summarize(degree, [(complex(root), 1) for root in roots])
+    return _summarize(degree, _clusters(coefficients, roots, _cluster_tol(degree)))
+
+
+def _summarize(degree, distinct):
+    described = []
+    for root, multiplicity in distinct:
+        is_real = abs(root.imag) <= REAL_TOL * max(1.0, abs(root)) or (multiplicity > 1 and abs(root.imag) <= REPEAT_TOL * max(1.0, abs(root)))
+        described.append({
+            'real': round(root.real, 12) + 0.0,
+            'imag': 0.0 if is_real else round(root.imag, 12) + 0.0,
+            'multiplicity': multiplicity,
+            'kind': 'real' if is_real else 'complex',
+        })
+    described.sort(key=lambda entry: (entry['kind'] == 'complex', entry['real'], entry['imag']))
+    real_count = sum(entry['multiplicity'] for entry in described if entry['kind'] == 'real')
+    return {
+        'degree': degree,
+        'roots': described,
+        'real_root_count': real_count,
+        'complex_root_count': degree - real_count,
+        'has_repeated_roots': any(entry['multiplicity'] > 1 for entry in described),
+    }
+
+
+def _no_roots(degree, error=None):
+    result = {'degree': degree, 'roots': [], 'real_root_count': 0, 'complex_root_count': 0,
+              'has_repeated_roots': False}
+    if error:
+        result['error'] = error
+    return result
+
+
+def solve_batch(polynomials):
+    """Solves a list of coefficient lists; returns one result dict per polynomial, in order."""
+    if not isinstance(polynomials, list) or not polynomials:
+        raise PolynomialError('Provide a non-empty list of polynomials.')
+    if len(polynomials) > MAX_BATCH:
+        raise PolynomialError(f'At most {MAX_BATCH} polynomials can be solved per request.')
+    keys = [_normalize(coefficients, index) for index, coefficients in enumerate(polynomials)]
+    cost = sum(max(len(key) - 1, 1) ** 3 for key in keys)
+    if cost > MAX_COST:
+        raise PolynomialError('This batch is too large to solve in one request; send fewer or lower-degree polynomials.')
+
+    results = [_solutions_cache.get(key) for key in keys]
+    by_degree = {}
+    for position, (key, result) in enumerate(zip(keys, results)):
+        if result is None:
+            by_degree.setdefault(len(key) - 1, []).append(position)
+
+    for degree, positions in by_degree.items():
+        if degree < 1:
+            # Constants: no roots (the zero polynomial is satisfied everywhere)
+            for position in positions:
+                message = 'Every number is a root of the zero polynomial.' if not keys[position] else None
+                results[position] = _no_roots(max(degree, 0), message)
+        else:
+            # Identical polynomials in one batch are solved once
+            unique = list(dict.fromkeys(keys[position] for position in positions))
+            coefficients = np.array(unique, dtype=float)
+            # Scaling a polynomial keeps its roots and keeps b*b, p(x), ... from overflowing
+            coefficients /= np.abs(coefficients).max(axis=1, keepdims=True)
+            with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+                if degree == 1:
+                    roots = (-coefficients[:, 1] / coefficients[:, 0])[:, None]
+                elif degree == 2:
+                    roots = _quadratic_roots(coefficients)
+                else:
+                    roots = _companion_roots(coefficients)
+                # Only rows with nearly coincident roots need the (per-polynomial) repeated-root check
+                close = _has_close_roots(roots, degree)
+            finite = np.all(np.isfinite(roots), axis=1)
+            solved = {key: _describe(tuple(scaled), row, check) if ok else
+                      _no_roots(degree, 'The roots are too large to represent.')
+                      for key, scaled, row, check, ok in zip(unique, coefficients, roots, close, finite)}
+            for position in positions:
+                results[position] = solved[keys[position]]
+        for position in positions:
+            _solutions_cache.set(keys[position], results[position])
+    return results
+
+
+def cache_stats():
+    return _solutions_cache.stats()
@@ -0,0 +1,63 @@
+# problem_stats.py
+from collections import Counter
+
+from sqlalchemy import select, func, case, delete, insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from extensions import db
+from models import Submission, ProblemStats
+
+
+def update_problem_stats(entries, new_solves):
+    """
+    Adds a batch of submissions to problem_stats with one executemany upsert, in the
+    caller's transaction. `new_solves` are the (user_id, problem_id) pairs solved for the
+    first time in this batch, which is what moves solver_count.
+    """
+    attempts = Counter(entry.problem_id for entry in entries)
+    accepted = Counter(entry.problem_id for entry in entries if entry.result == 'Accepted')
+    solvers = Counter(problem_id for _, problem_id in new_solves)
+
+    stmt = sqlite_insert(ProblemStats)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ProblemStats.problem_id],
+        set_={
+            'attempt_count': ProblemStats.attempt_count + stmt.excluded.attempt_count,
+            'accepted_count': ProblemStats.accepted_count + stmt.excluded.accepted_count,
+            'solver_count': ProblemStats.solver_count + stmt.excluded.solver_count,
+        },
+    )
+    db.session.execute(stmt, [
+        dict(problem_id=problem_id, attempt_count=count,
+             accepted_count=accepted[problem_id], solver_count=solvers[problem_id])
+        for problem_id, count in attempts.items()
+    ])
+
+
+def rebuild_problem_stats():
+    """
+    Recomputes problem_stats from scratch with one INSERT ... SELECT ... GROUP BY over the
+    submission table; the database streams the aggregation, nothing is loaded into Python.
+    Returns the number of problems with statistics.
+    """
+    is_accepted = Submission.result == 'Accepted'
+    aggregate = select(
+        Submission.problem_id,
+        func.count(),
+        func.sum(case((is_accepted, 1), else_=0)),
+        func.count(func.distinct(case((is_accepted, Submission.user_id)))),
+    ).group_by(Submission.problem_id)
+
+    db.session.execute(delete(ProblemStats))
+    db.session.execute(insert(ProblemStats).from_select(
+        ['problem_id', 'attempt_count', 'accepted_count', 'solver_count'], aggregate))
+    db.session.commit()
+    return db.session.query(func.count(ProblemStats.problem_id)).scalar()
+
+
+def stats_for(problem_ids):
+    """Maps problem id -> ProblemStats for the given ids (problems without submissions are absent)."""
+    if not problem_ids:
+        return {}
+    rows = ProblemStats.query.filter(ProblemStats.problem_id.in_(problem_ids)).all()
+    return {row.problem_id: row for row in rows}
@@ -1,25 +1,28 @@
 # problems.py
+from collections import namedtuple
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 from models import Problem, Submission, User # Import User model
 from extensions import db
+from submission_buffer import submission_buffer
+from problem_stats import stats_for
+from recommendations import recommend_for
+from cache import cache
 
 
 problems = Blueprint('problems', __name__)
 
-@problems.route('/dashboard')
-@login_required
-def dashboard():
+# The fields of a problem the dashboard shows; cached listings are shared by every worker
+ProblemListing = namedtuple('ProblemListing', 'id title description topic difficulty_level')
+
+def problem_topics():
     # Get all unique topics for display
     topics = db.session.query(Problem.topic).distinct().all()
     # Flatten the list of tuples into a simple list of strings
-    topics = sorted([t[0] for t in topics])
-
-    # Get filter and sort parameters from URL query string
-    selected_topic = request.args.get('topic')
-    sort_order = request.args.get('sort', 'asc') # 'asc' for easy to difficult, 'desc' for difficult to easy
+    return sorted([t[0] for t in topics])
 
-    query = Problem.query
+def problem_listing(selected_topic, sort_order):
+    query = db.session.query(Problem.id, Problem.title, Problem.description, Problem.topic, Problem.difficulty_level)
 
     # Apply topic filter if selected
     if selected_topic and selected_topic != 'All Topics': # 'All Topics' is a special case for no filter
@@ -34,10 +37,26 @@ def dashboard():
         # Default sorting if no valid sort_order is provided
         query = query.order_by(Problem.id.asc()) # Or by title, etc.
 
-    all_problems = query.all()
+    return [ProblemListing(*row) for row in query.all()]
+
+@problems.route('/dashboard')
+@login_required
+def dashboard():
+    # Get filter and sort parameters from URL query string
+    selected_topic = request.args.get('topic')
+    sort_order = request.args.get('sort', 'asc') # 'asc' for easy to difficult, 'desc' for difficult to easy
+
+    # Topics and listings are cached until a problem changes (the 'problems' namespace)
+    topics = cache.get_or_set('problems', 'topics', problem_topics)
+    all_problems = cache.get_or_set('problems', f'listing:{selected_topic}:{sort_order}',
+                                    lambda: problem_listing(selected_topic, sort_order))
+    # Acceptance rate / attempts / solvers come from the pre-aggregated problem_stats table
+    problem_stats = stats_for([p.id for p in all_problems])
 
     return render_template('dashboard.html',
                            problems=all_problems,
+                           problem_stats=problem_stats,
+                           recommended=recommend_for(current_user),
                            topics=topics,
                            selected_topic=selected_topic,
                            sort_order=sort_order)
@@ -56,37 +75,24 @@ def problem_detail(pid):
         # Check the submitted answer
         result = check_answer(submitted_answer, problem.answer)
 
-        # Save the submission
-        submission = Submission(user_id=current_user.id, problem_id=pid, submitted_answer=submitted_answer, result=result)
-        db.session.add(submission)
-
-        # Update user's solved problems count and score if the answer is accepted
-        if result == "Accepted":
-            # Check if this specific problem has been previously solved by the user
-            # We only want to increment solved_problems_count and score once per unique problem
-            existing_accepted_submission = Submission.query.filter_by(
-                user_id=current_user.id, problem_id=pid, result='Accepted'
-            ).first()
-
-            if  existing_accepted_submission: # Only increment if it's a new accepted solution for this problem
-                current_user.solved_problems_count += 1
-                # You can define how much score a problem gives, e.g., based on difficulty
-                current_user.score += problem.difficulty_level * 10 # Example: Easy=10, Medium=20, Hard=30 points
-                
-                # IMPORTANT: Add the current_user object to the session to track its changes
-                db.session.add(current_user) 
-        
-        # Commit all changes (submission and user updates) in one go
-        db.session.commit()
+        # Save the submission. It is buffered and committed in batches by the write-behind
+        # flusher, which also updates the user's solved count and score (once per problem,
+        # worth difficulty_level * 10 points: Easy=10, Medium=20, Hard=30)
+        submission_buffer.record(current_user.id, pid, submitted_answer, result,
+                                 points=problem.difficulty_level * 10)
         flash(f"Submission Result: {result}", 'info')
 
-    # Fetch previous submissions for this user and problem
+    # Fetch previous submissions for this user and problem, including ones not flushed yet
     user_submissions = Submission.query.filter_by(
         user_id=current_user.id, problem_id=pid
     ).order_by(Submission.timestamp.desc()).all()
+    pending = submission_buffer.pending_for(current_user.id, pid)
+    if pending:
+        user_submissions = sorted(pending + user_submissions, key=lambda s: s.timestamp, reverse=True)
 
     return render_template('problem_detail.html',
                            problem=problem,
+                           stats=stats_for([pid]).get(pid),
                            result=result,
                            submitted_answer_value=submitted_answer_value,
                            user_submissions=user_submissions)
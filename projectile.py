@@ -0,0 +1,243 @@
+# projectile.py
+"""
+Vectorized projectile-motion engine used by the NEET physics API.
+
+Every function works on whole batches at once: parameters are NumPy arrays of shape (n,)
+and trajectories come back as (n, samples) arrays. Drag is modelled as quadratic air
+resistance, a = -g*y_hat - k*|v|*v, where k is the drag coefficient per unit mass (1/m).
+"""
+import numpy as np
+
+from lru import LRUCache
+
+MAX_BATCH = 1000 # Parameter sets accepted in one call
+MAX_SAMPLES = 500 # Points returned per trajectory
+DRAG_STEPS = 1000 # Integration steps per trajectory when drag is on
+MAX_DRAG_CHUNKS = 20 # Integration continues in chunks of DRAG_STEPS until every trajectory lands
+STABILITY = 0.5 # Largest drag*|v|*dt per step; explicit RK2 diverges once it passes 1
+ACCURACY = 0.03 # Largest relative change of velocity per step while drag is still slowing a fast projectile
+
+PARAM_DEFAULTS = {'height': 0.0, 'g': 9.8, 'drag': 0.0}
+
+# Results per parameter set, so repeated grids (the same worksheet for a whole class) are free
+_results_cache = LRUCache(maxsize=4096)
+
+
+class ProjectileError(ValueError):
+    """Raised for invalid parameter sets; the message is safe to show to users."""
+
+
+def parse_params(items):
+    """Validates a list of parameter dicts and returns arrays (velocity, angle_deg, height, g, drag)."""
+    if not isinstance(items, list) or not items:
+        raise ProjectileError('Provide a non-empty list of parameter sets.')
+    if len(items) > MAX_BATCH:
+        raise ProjectileError(f'At most {MAX_BATCH} parameter sets can be computed per request.')
+    rows = []
+    for index, item in enumerate(items):
+        try:
+            rows.append((float(item['velocity']), float(item['angle']),
+                         float(item.get('height', PARAM_DEFAULTS['height'])),
+                         float(item.get('g', PARAM_DEFAULTS['g'])),
+                         float(item.get('drag', PARAM_DEFAULTS['drag']))))
+        except (TypeError, KeyError, ValueError, AttributeError, OverflowError):
+            raise ProjectileError(f'Parameter set {index + 1} needs numeric "velocity" and "angle".')
+    velocity, angle, height, g, drag = np.array(rows, dtype=float).T
+    if not np.all(np.isfinite([velocity, angle, height, g, drag])):
+        raise ProjectileError('Parameters must be finite numbers.')
+    if np.any(velocity < 0) or np.any(height < 0) or np.any(drag < 0):
+        raise ProjectileError('Velocity, height and drag cannot be negative.')
+    if np.any(g <= 0):
+        raise ProjectileError('Gravity must be positive.')
+    if np.any(np.abs(angle) > 90):
+        raise ProjectileError('Angle must be between -90 and 90 degrees.')
+    return velocity, angle, height, g, drag
+
+
+def analytic_summary(velocity, angle_deg, height, g):
+    """Closed-form time of flight, range, peak time and max height without air resistance."""
+    theta = np.radians(angle_deg)
+    vx = velocity * np.cos(theta)
+    vy = velocity * np.sin(theta)
+    time_of_flight = (vy + np.sqrt(vy ** 2 + 2 * g * height)) / g
+    time_to_peak = np.maximum(vy, 0) / g
+    max_height = height + np.maximum(vy, 0) ** 2 / (2 * g)
+    return {
+        'time_of_flight': time_of_flight,
+        'range': vx * time_of_flight,
+        'time_to_peak': time_to_peak,
+        'max_height': max_height,
+    }
+
+
+def analytic_paths(velocity, angle_deg, height, g, time_of_flight, samples):
+    """Samples x(t), y(t) at `samples` evenly spaced times over each flight."""
+    theta = np.radians(angle_deg)[:, None]
+    t = np.linspace(0.0, 1.0, samples)[None, :] * time_of_flight[:, None]
+    x = velocity[:, None] * np.cos(theta) * t
+    y = height[:, None] + velocity[:, None] * np.sin(theta) * t - 0.5 * g[:, None] * t ** 2
+    return t, x, np.maximum(y, 0.0)
+
+
+def _drag_fall_time(height, g, drag):
+    """Time to fall `height` from rest with quadratic drag: arccosh(exp(k*h)) / sqrt(g*k)."""
+    kh = drag * height
+    # arccosh(exp(kh)) ~ kh + ln 2 once exp(kh) is large; avoids overflow
+    acosh = np.where(kh > 20, kh + np.log(2), np.arccosh(np.exp(np.minimum(kh, 20))))
+    return acosh / np.sqrt(g * drag)
+
+
+def integrate_drag(velocity, angle_deg, height, g, drag, samples, steps=DRAG_STEPS):
+    """
+    Midpoint (RK2) integration of the whole batch in lock-step. Each trajectory gets its own
+    time step, sized from an estimate of its flight time with drag (drag-free rise, then a
+    vertical fall from the drag-free peak at the drag-limited speed). Steps are shortened
+    so drag*|v|*dt stays below STABILITY, where explicit steps blow up, and so the velocity
+    changes by at most ACCURACY (relative to the larger of |v| and the terminal speed) per step.
+    Integration continues in further chunks of `steps` until every trajectory has landed;
+    one that still hasn't after MAX_DRAG_CHUNKS is an error.
+    """
+    n = velocity.size
+    theta = np.radians(angle_deg)
+    free = analytic_summary(velocity, angle_deg, height, g)
+    estimate = free['time_to_peak'] + _drag_fall_time(free['max_height'], g, drag)
+    nominal_dt = np.where(estimate > 0, estimate * 1.05 / steps, 0.0)
+
+    vx = velocity * np.cos(theta)
+    vy = velocity * np.sin(theta)
+    terminal = np.sqrt(g / drag) # Speed at which drag balances gravity
+
+    def accel(vx, vy):
+        speed = np.hypot(vx, vy)
+        return -drag * speed * vx, -g - drag * speed * vy
+
+    t_chunks, x_chunks, y_chunks = [np.zeros((n, 1))], [np.zeros((n, 1))], [height[:, None].astype(float)]
+    # Nothing to integrate when there is no flight at all (dt = 0)
+    landed = nominal_dt == 0
+    for _ in range(MAX_DRAG_CHUNKS):
+        t = np.empty((n, steps))
+        x = np.empty((n, steps))
+        y = np.empty((n, steps))
+        pt, px, py = t_chunks[-1][:, -1], x_chunks[-1][:, -1], y_chunks[-1][:, -1]
+        for step in range(steps):
+            speed = np.hypot(vx, vy)
+            ax, ay = accel(vx, vy)
+            dt = np.minimum(nominal_dt, np.minimum(
+                STABILITY / np.maximum(drag * speed, 1e-300),
+                ACCURACY * np.maximum(speed, terminal) / np.maximum(np.hypot(ax, ay), 1e-300)))
+            mid_vx, mid_vy = vx + 0.5 * dt * ax, vy + 0.5 * dt * ay
+            mid_ax, mid_ay = accel(mid_vx, mid_vy)
+            pt = t[:, step] = pt + dt
+            px = x[:, step] = px + dt * mid_vx
+            py = y[:, step] = py + dt * mid_vy
+            vx, vy = vx + dt * mid_ax, vy + dt * mid_ay
+        t_chunks.append(t)
+        x_chunks.append(x)
+        y_chunks.append(y)
+        landed |= (y < 0).any(axis=1)
+        if landed.all():
+            break
+    else:
+        raise ProjectileError('A trajectory did not land within the simulated time; reduce the drag or height.')
+
+    t = np.concatenate(t_chunks, axis=1)
+    x = np.concatenate(x_chunks, axis=1)
+    y = np.concatenate(y_chunks, axis=1)
+    steps = x.shape[1] - 1
+
+    # Landing: first step where y crosses zero (after launch), refined by linear interpolation
+    below = y[:, 1:] < 0
+    landed = below.any(axis=1)
+    land_step = np.where(landed, below.argmax(axis=1) + 1, steps)
+    rows = np.arange(n)
+    y_before, y_after = y[rows, land_step - 1], y[rows, land_step]
+    fraction = np.where(landed & (y_before != y_after), y_before / np.where(y_before != y_after, y_before - y_after, 1.0), 0.0)
+    time_of_flight = np.where(landed, t[rows, land_step - 1] + fraction * (t[rows, land_step] - t[rows, land_step - 1]), 0.0)
+    x_land = x[rows, land_step - 1] + fraction * (x[rows, land_step] - x[rows, land_step - 1])
+
+    # Peak, looking only at the airborne part of each trajectory
+    airborne = np.arange(steps + 1)[None, :] < land_step[:, None]
+    y_airborne = np.where(airborne, y, -np.inf)
+    peak_step = y_airborne.argmax(axis=1)
+
+    # Resample every trajectory at `samples` evenly spaced times over its own flight. Steps vary
+    # in length, so find each sample's step with one searchsorted over all rows laid end to end:
+    # row r's times are shifted by r * span, which keeps the flattened array sorted
+    sample_t = np.linspace(0.0, 1.0, samples)[None, :] * time_of_flight[:, None]
+    span = t[:, -1].max() + 1.0
+    offsets = rows[:, None] * span
+    flat = np.searchsorted((t + offsets).ravel(), (sample_t + offsets).ravel(), side='right') - 1
+    lower = np.clip(flat.reshape(n, samples) - rows[:, None] * (steps + 1), 0, steps - 1)
+    t_lower, t_upper = t[rows[:, None], lower], t[rows[:, None], lower + 1]
+    weight = np.clip(np.where(t_upper > t_lower, (sample_t - t_lower) / np.where(t_upper > t_lower, t_upper - t_lower, 1.0), 0.0), 0.0, 1.0)
+    x_path = x[rows[:, None], lower] * (1 - weight) + x[rows[:, None], lower + 1] * weight
+    y_path = y[rows[:, None], lower] * (1 - weight) + y[rows[:, None], lower + 1] * weight
+
+    summary = {
+        'time_of_flight': time_of_flight,
+        'range': x_land,
+        'time_to_peak': t[rows, peak_step],
+        'max_height': y[rows, peak_step],
+    }
+    return summary, (sample_t, x_path, np.maximum(y_path, 0.0))
+
+
+def compute_batch(items, samples=50, include_path=True):
+    """
+    Computes summaries (and optionally sampled paths) for a list of parameter dicts.
+    Drag-free sets use closed-form expressions; sets with drag are integrated together.
+    """
+    try:
+        samples = int(samples)
+    except (TypeError, ValueError, OverflowError):
+        raise ProjectileError('Samples must be a whole number.')
+    if not 2 <= samples <= MAX_SAMPLES:
+        raise ProjectileError(f'Samples must be between 2 and {MAX_SAMPLES}.')
+    params = parse_params(items)
+
+    keys = [(*(round(float(value), 6) for value in row), samples, bool(include_path)) for row in zip(*params)]
+    results = [_results_cache.get(key) for key in keys]
+    missing = np.array([index for index, result in enumerate(results) if result is None], dtype=int)
+
+    if missing.size:
+        velocity, angle, height, g, drag = (column[missing] for column in params)
+        computed = [None] * missing.size
+        for with_drag in (False, True):
+            group = drag > 0 if with_drag else drag == 0
+            if not group.any():
+                continue
+            # Huge inputs overflow to Infinity/NaN, which is checked for below
+            with np.errstate(over='ignore', invalid='ignore'):
+                if with_drag:
+                    summary, paths = integrate_drag(velocity[group], angle[group], height[group], g[group],
+                                                    drag[group], samples)
+                else:
+                    summary = analytic_summary(velocity[group], angle[group], height[group], g[group])
+                    paths = analytic_paths(velocity[group], angle[group], height[group], g[group],
+                                           summary['time_of_flight'], samples) if include_path else None
+            overflow = ~np.all([np.isfinite(values) for values in summary.values()], axis=0)
+            if overflow.any():
+                index = missing[np.flatnonzero(group)[overflow.argmax()]]
+                raise ProjectileError(f'Parameter set {index + 1} is too large to compute.')
+            for position, local in zip(np.flatnonzero(group), range(group.sum())):
+                result = {
+                    'velocity': float(velocity[position]), 'angle': float(angle[position]),
+                    'height': float(height[position]), 'g': float(g[position]), 'drag': float(drag[position]),
+                }
+                result.update({name: round(float(values[local]), 4) for name, values in summary.items()})
+                if include_path:
+                    t, x, y = paths
+                    result['path'] = {
+                        't': np.round(t[local], 4).tolist(),
+                        'x': np.round(x[local], 4).tolist(),
+                        'y': np.round(y[local], 4).tolist(),
+                    }
+                computed[position] = result
+        for index, result in zip(missing, computed):
+            _results_cache.set(keys[index], result)
+            results[index] = result
+    return results
+
+
+def cache_stats():
+    return _results_cache.stats()
@@ -1,32 +1,44 @@
 # quiz.py
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from collections import namedtuple
+from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, current_app
 from flask_login import login_required, current_user
-from models import Quiz, Question, Option, QuizAttempt
+from models import Quiz, QuizAttempt
 from extensions import db
+from quiz_payload import build_quiz_payload, grade
+from analytics import record_quiz_attempt
+from cache import cache
 
 quiz = Blueprint('quiz', __name__)
 
-@quiz.route('/quizzes')
-@login_required
-def quiz_selection():
+# The fields of a quiz the selection page shows; cached listings are shared by every worker
+QuizListing = namedtuple('QuizListing', 'id title topic class_level pass_mark')
+
+def quiz_filters():
     # Fetch all unique topics and class levels for quiz filtering
     quiz_topics = db.session.query(Quiz.topic).distinct().all()
     quiz_class_levels = db.session.query(Quiz.class_level).distinct().all()
+    return sorted([t[0] for t in quiz_topics]), sorted([c[0] for c in quiz_class_levels])
 
-    quiz_topics = sorted([t[0] for t in quiz_topics])
-    quiz_class_levels = sorted([c[0] for c in quiz_class_levels])
-
-    selected_topic = request.args.get('topic')
-    selected_class_level = request.args.get('class_level')
-
-    query = Quiz.query
+def quiz_listing(selected_topic, selected_class_level):
+    query = db.session.query(Quiz.id, Quiz.title, Quiz.topic, Quiz.class_level, Quiz.pass_mark)
 
     if selected_topic and selected_topic != 'All Topics':
         query = query.filter_by(topic=selected_topic)
     if selected_class_level and selected_class_level != 'All Classes':
         query = query.filter_by(class_level=selected_class_level)
 
-    available_quizzes = query.order_by(Quiz.title.asc()).all()
+    return [QuizListing(*row) for row in query.order_by(Quiz.title.asc()).all()]
+
+@quiz.route('/quizzes')
+@login_required
+def quiz_selection():
+    selected_topic = request.args.get('topic')
+    selected_class_level = request.args.get('class_level')
+
+    # Filters and listings are cached until a quiz changes (the 'quizzes' namespace)
+    quiz_topics, quiz_class_levels = cache.get_or_set('quizzes', 'filters', quiz_filters)
+    available_quizzes = cache.get_or_set('quizzes', f'listing:{selected_topic}:{selected_class_level}',
+                                         lambda: quiz_listing(selected_topic, selected_class_level))
 
     # Fetch user's latest attempt for each quiz to display score/status
     user_latest_attempts = {}
@@ -46,24 +58,21 @@ def quiz_selection():
 @quiz.route('/quiz/<int:quiz_id>/start', methods=['GET', 'POST'])
 @login_required
 def start_quiz(quiz_id):
-    current_quiz = Quiz.query.get_or_404(quiz_id)
-    questions = Question.query.filter_by(quiz_id=quiz_id).order_by(Question.id.asc()).all()
+    # Quiz, questions and options come from one cached, pre-built payload (two queries on a miss)
+    payload = build_quiz_payload(quiz_id)
+    if payload is None:
+        abort(404)
+    current_quiz = payload.quiz
+    questions = payload.questions
 
     if not questions:
         flash("This quiz has no questions yet!", 'warning')
         return redirect(url_for('quiz.quiz_selection'))
 
     if request.method == 'POST':
-        score = 0
+        # The answer key is part of the payload, so grading needs no per-question queries
+        score = grade(payload, request.form)
         total_questions = len(questions)
-        for q in questions:
-            # Get the submitted option ID for this question
-            submitted_option_id = request.form.get(f'question_{q.id}')
-            if submitted_option_id:
-                # Find the option that was submitted
-                selected_option = Option.query.get(int(submitted_option_id))
-                if selected_option and selected_option.is_correct:
-                    score += 1
 
         passed = score >= current_quiz.pass_mark
         new_attempt = QuizAttempt(
@@ -74,10 +83,19 @@ def start_quiz(quiz_id):
             passed=passed
         )
         db.session.add(new_attempt)
+        record_quiz_attempt(new_attempt, current_quiz) # Teacher analytics rollup, same transaction
         db.session.commit()
 
         return redirect(url_for('quiz.quiz_result', attempt_id=new_attempt.id))
 
+    # ?format=json serves the same quiz (without answers) for client-side rendering
+    if request.args.get('format') == 'json':
+        response = current_app.response_class(payload.json, mimetype='application/json')
+        response.set_etag(payload.etag)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+
     return render_template('start_quiz.html', quiz=current_quiz, questions=questions)
 
 
@@ -0,0 +1,68 @@
+# quiz_payload.py
+import hashlib
+import json
+from collections import namedtuple
+
+from sqlalchemy.orm import joinedload
+
+from cache import cache
+from extensions import db
+from models import Quiz, Question
+
+# Read-only views of a quiz; Jinja reads them exactly like the ORM objects (quiz.title, question.options, ...)
+QuizView = namedtuple('QuizView', 'id title topic class_level pass_mark')
+QuestionView = namedtuple('QuestionView', 'id text options')
+OptionView = namedtuple('OptionView', 'id text')
+
+# answer_key maps question id -> frozenset of correct option ids; json/etag are the client payload
+QuizPayload = namedtuple('QuizPayload', 'quiz questions answer_key json etag')
+
+
+def build_quiz_payload(quiz_id):
+    """
+    Loads a quiz with all its questions and options in two queries (the quiz joined with
+    its questions, then every option via selectinload) and returns an immutable QuizPayload,
+    or None if the quiz does not exist. Payloads are cached per quiz id in the shared
+    'quizzes' cache namespace, which any quiz, question or option write invalidates.
+    """
+    payload = cache.get('quizzes', f'payload:{quiz_id}')
+    if payload is not None:
+        return payload
+
+    quiz = db.session.get(Quiz, quiz_id, options=[joinedload(Quiz.questions).selectinload(Question.options)])
+    if quiz is None:
+        return None
+
+    questions, answer_key = [], {}
+    for question in sorted(quiz.questions, key=lambda q: q.id):
+        options = sorted(question.options, key=lambda o: o.id)
+        questions.append(QuestionView(question.id, question.text,
+                                      tuple(OptionView(option.id, option.text) for option in options)))
+        answer_key[question.id] = frozenset(option.id for option in options if option.is_correct)
+    quiz_view = QuizView(quiz.id, quiz.title, quiz.topic, quiz.class_level, quiz.pass_mark)
+
+    # Compact client-side payload; never includes which options are correct
+    body = json.dumps({
+        'quiz': quiz_view._asdict(),
+        'questions': [{'id': q.id, 'text': q.text, 'options': [o._asdict() for o in q.options]} for q in questions],
+    }, separators=(',', ':')).encode('utf-8')
+
+    payload = QuizPayload(quiz_view, tuple(questions), answer_key, body, hashlib.sha1(body).hexdigest())
+    cache.set('quizzes', f'payload:{quiz_id}', payload)
+    return payload
+
+
+def grade(payload, form):
+    """Counts correct answers in a submitted form (fields named question_<id>)."""
+    score = 0
+    for question in payload.questions:
+        submitted_option_id = form.get(f'question_{question.id}')
+        if submitted_option_id and submitted_option_id.isdigit() \
+                and int(submitted_option_id) in payload.answer_key[question.id]:
+            score += 1
+    return score
+
+
+def invalidate_quiz_payloads():
+    """Drops every cached quiz, e.g. after bulk edits that bypass the ORM."""
+    cache.invalidate('quizzes')
@@ -0,0 +1,203 @@
+# recommendations.py
+"""
+"What to solve next" recommendations for the problems dashboard.
+
+Each user has a mastery estimate per topic, kept in topic_mastery and updated with every
+submission batch: the difficulty-weighted share of accepted attempts, smoothed towards 0.5
+for topics with little history. A user's ideal difficulty in a topic grows with mastery,
+and weak or barely tried topics get a bonus. Every problem in the cached catalog arrays is
+scored in one vectorized expression, solved problems are masked out and the top k are
+picked with argpartition. The top-k list is cached per user, tagged with the total attempts in
+their topic_mastery rows: every committed submission changes that total, so a list is never
+served after the user's next submission, whichever worker cached it.
+
+The catalog arrays stay in each worker's memory (unpickling them per request would cost more
+than scoring), tagged with the generation of the shared 'problems' cache namespace, so a
+problem edit in any worker makes every worker rebuild them.
+"""
+import threading
+from collections import namedtuple, defaultdict
+
+import numpy as np
+from sqlalchemy import select, func, case, delete, insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from cache import cache
+from extensions import db
+from lru import LRUCache
+from models import Problem, Submission, TopicMastery
+
+DEFAULT_K = 5
+PRIOR = 1.0 # Pseudo-attempts (half of them accepted) added to every topic, so mastery starts at 0.5
+EXPLORE_WEIGHT = 0.75 # Bonus for topics the user has barely tried; decays with 1/sqrt(1 + attempts)
+WEAKNESS_WEIGHT = 0.5 # Bonus for topics with low mastery
+MIN_DIFFICULTY, MAX_DIFFICULTY = 1, 3
+
+# The problem catalog as arrays; row i describes problem ids[i]
+Catalog = namedtuple('Catalog', 'ids titles topics topic_index topic_of difficulty row_of generation')
+RecommendedProblem = namedtuple('RecommendedProblem', 'id title topic difficulty_level')
+
+_catalog = None
+_catalog_lock = threading.Lock()
+# Per user id: (mastery version, k, top-k list)
+_recommendations_cache = LRUCache(maxsize=4096)
+
+
+def get_catalog():
+    """Loads id, title, topic and difficulty of every problem into arrays; reloaded after problem edits."""
+    global _catalog
+    generation = cache.generation('problems')
+    catalog = _catalog
+    if catalog is not None and catalog.generation == generation:
+        return catalog
+    with _catalog_lock:
+        if _catalog is None or _catalog.generation != generation:
+            if _catalog is not None:
+                _recommendations_cache.clear()
+            rows = db.session.execute(
+                select(Problem.id, Problem.title, Problem.topic, Problem.difficulty_level).order_by(Problem.id)
+            ).all()
+            topics = sorted({row.topic for row in rows})
+            topic_index = {topic: i for i, topic in enumerate(topics)}
+            _catalog = Catalog(
+                ids=np.array([row.id for row in rows], dtype=np.int64),
+                titles=[row.title for row in rows],
+                topics=topics,
+                topic_index=topic_index,
+                topic_of=np.array([topic_index[row.topic] for row in rows], dtype=np.intp),
+                difficulty=np.array([row.difficulty_level for row in rows], dtype=float),
+                row_of={row.id: i for i, row in enumerate(rows)},
+                generation=generation,
+            )
+        return _catalog
+
+
+def invalidate_catalog():
+    """Drops the catalog arrays and every cached recommendation list."""
+    global _catalog
+    with _catalog_lock:
+        _catalog = None
+    _recommendations_cache.clear()
+
+
+def update_topic_mastery(entries):
+    """
+    Adds a batch of submissions to topic_mastery with one executemany upsert, in the caller's
+    transaction. Once it commits, the users' mastery versions have changed, so their cached
+    recommendation lists are recomputed on their next visit in every worker.
+    """
+    problems = {row.id: row for row in db.session.execute(
+        select(Problem.id, Problem.topic, Problem.difficulty_level)
+        .where(Problem.id.in_({entry.problem_id for entry in entries}))
+    )}
+    totals = defaultdict(lambda: [0, 0.0, 0.0])
+    for entry in entries:
+        problem = problems.get(entry.problem_id)
+        if problem is None:
+            continue
+        total = totals[(entry.user_id, problem.topic)]
+        total[0] += 1
+        total[1] += problem.difficulty_level
+        if entry.result == 'Accepted':
+            total[2] += problem.difficulty_level
+    if not totals:
+        return
+
+    stmt = sqlite_insert(TopicMastery)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TopicMastery.user_id, TopicMastery.topic],
+        set_={
+            'attempts': TopicMastery.attempts + stmt.excluded.attempts,
+            'weighted_attempts': TopicMastery.weighted_attempts + stmt.excluded.weighted_attempts,
+            'weighted_accepted': TopicMastery.weighted_accepted + stmt.excluded.weighted_accepted,
+        },
+    )
+    db.session.execute(stmt, [
+        dict(user_id=user_id, topic=topic, attempts=attempts,
+             weighted_attempts=weighted_attempts, weighted_accepted=weighted_accepted)
+        for (user_id, topic), (attempts, weighted_attempts, weighted_accepted) in totals.items()
+    ])
+
+
+def rebuild_topic_mastery():
+    """Recomputes topic_mastery from all submissions in one INSERT ... SELECT ... GROUP BY."""
+    weighted_accepted = case((Submission.result == 'Accepted', Problem.difficulty_level), else_=0)
+    aggregate = (select(Submission.user_id, Problem.topic, func.count(),
+                        func.sum(Problem.difficulty_level), func.sum(weighted_accepted))
+                 .join(Problem, Problem.id == Submission.problem_id)
+                 .group_by(Submission.user_id, Problem.topic))
+    db.session.execute(delete(TopicMastery))
+    db.session.execute(insert(TopicMastery).from_select(
+        ['user_id', 'topic', 'attempts', 'weighted_attempts', 'weighted_accepted'], aggregate))
+    db.session.commit()
+    _recommendations_cache.clear()
+    return db.session.query(func.count()).select_from(TopicMastery).scalar()
+
+
+def mastery_version(user_id):
+    """Total attempts in a user's committed topic_mastery rows; every applied submission changes it."""
+    return db.session.execute(
+        select(func.coalesce(func.sum(TopicMastery.attempts), 0)).where(TopicMastery.user_id == user_id)
+    ).scalar()
+
+
+def topic_vectors(user_id, catalog):
+    """Per-topic (mastery, attempts) arrays for a user, aligned with catalog.topics."""
+    mastery = np.full(len(catalog.topics), 0.5)
+    attempts = np.zeros(len(catalog.topics))
+    for row in db.session.execute(
+            select(TopicMastery.topic, TopicMastery.attempts, TopicMastery.weighted_attempts,
+                   TopicMastery.weighted_accepted).where(TopicMastery.user_id == user_id)):
+        i = catalog.topic_index.get(row.topic)
+        if i is not None:
+            mastery[i] = (row.weighted_accepted + PRIOR / 2) / (row.weighted_attempts + PRIOR)
+            attempts[i] = row.attempts
+    return mastery, attempts
+
+
+def score_problems(catalog, mastery, attempts):
+    """Scores every catalog problem for one user's topic vectors (higher is a better next pick)."""
+    target = MIN_DIFFICULTY + mastery * (MAX_DIFFICULTY - MIN_DIFFICULTY)
+    bonus = EXPLORE_WEIGHT / np.sqrt(1 + attempts) + WEAKNESS_WEIGHT * (1 - mastery)
+    # Per-topic target difficulty and bonus, gathered onto the problems in one indexing operation
+    per_problem = np.stack([target, bonus], axis=1)[catalog.topic_of]
+    return per_problem[:, 1] - (catalog.difficulty - per_problem[:, 0]) ** 2
+
+
+def solved_rows(user_id, catalog):
+    solved = db.session.execute(
+        select(Submission.problem_id).distinct()
+        .where(Submission.user_id == user_id, Submission.result == 'Accepted')
+    ).scalars()
+    return np.fromiter((catalog.row_of[pid] for pid in solved if pid in catalog.row_of), dtype=np.intp)
+
+
+def recommend_for(user, k=DEFAULT_K):
+    """Top-k unsolved problems for a user, best first, as RecommendedProblem tuples."""
+    version = (mastery_version(user.id), k)
+    cached = _recommendations_cache.get(user.id)
+    if cached is not None and cached[:2] == version:
+        return cached[2]
+
+    catalog = get_catalog()
+    if not catalog.ids.size:
+        return []
+    scores = score_problems(catalog, *topic_vectors(user.id, catalog))
+    scores[solved_rows(user.id, catalog)] = -np.inf
+
+    k = min(k, int(np.isfinite(scores).sum()))
+    if k <= 0:
+        recommended = []
+    else:
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        recommended = [RecommendedProblem(int(catalog.ids[row]), catalog.titles[row],
+                                          catalog.topics[catalog.topic_of[row]], int(catalog.difficulty[row]))
+                       for row in top]
+    _recommendations_cache.set(user.id, (*version, recommended))
+    return recommended
+
+
+def cache_stats():
+    return _recommendations_cache.stats()
+
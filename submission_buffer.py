@@ -0,0 +1,297 @@
+# submission_buffer.py
+import atexit
+import glob
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import namedtuple
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import insert, select, bindparam, func
+
+try:
+    import fcntl # Log files are locked by their owning worker; not available on Windows
+except ImportError:
+    fcntl = None
+
+from extensions import db
+from models import Submission, User, SubmissionLogCheckpoint
+from problem_stats import update_problem_stats
+from recommendations import update_topic_mastery
+from cache import cache
+
+# A graded submission that may not be in the database yet
+BufferedSubmission = namedtuple('BufferedSubmission',
+                                'seq user_id problem_id submitted_answer result points timestamp')
+
+LOG_PATTERN = 'submissions-*.log'
+
+
+def _encode(entry):
+    data = entry._asdict()
+    data['timestamp'] = entry.timestamp.isoformat()
+    return json.dumps(data, separators=(',', ':'))
+
+
+def _decode(line):
+    data = json.loads(line)
+    data['timestamp'] = datetime.fromisoformat(data['timestamp'])
+    return BufferedSubmission(**data)
+
+
+def _begin_write():
+    """
+    Starts the session's transaction with BEGIN IMMEDIATE unless one is already open. pysqlite
+    only begins at the first write, so without this the first-solve check below would read
+    without a lock, and two workers flushing the same answer could both credit the solve.
+    """
+    dbapi_connection = db.session.connection().connection.dbapi_connection
+    if not dbapi_connection.in_transaction:
+        dbapi_connection.execute('BEGIN IMMEDIATE')
+
+
+def apply_submissions(entries, log_name=None):
+    """
+    Writes a batch of graded submissions in the current session (the caller commits):
+    one executemany INSERT for the rows, one executemany UPDATE with the per-user score
+    and solved-count deltas, the problem_stats and topic_mastery upserts, and the log
+    checkpoint when the batch came from a log.
+    A problem only counts as solved (and scores) the first time a user gets it accepted;
+    the write lock is taken before that is checked.
+    Returns the set of (user_id, problem_id) pairs solved for the first time.
+    """
+    _begin_write()
+    accepted = {(e.user_id, e.problem_id) for e in entries if e.result == 'Accepted'}
+    already_solved = set()
+    if accepted:
+        user_ids = {user_id for user_id, _ in accepted}
+        problem_ids = {problem_id for _, problem_id in accepted}
+        already_solved = set(db.session.execute(
+            select(Submission.user_id, Submission.problem_id).distinct()
+            .where(Submission.result == 'Accepted',
+                   Submission.user_id.in_(user_ids),
+                   Submission.problem_id.in_(problem_ids))
+        ).all())
+
+    new_solves, deltas = set(), {}
+    for entry in entries:
+        pair = (entry.user_id, entry.problem_id)
+        if entry.result == 'Accepted' and pair not in already_solved and pair not in new_solves:
+            new_solves.add(pair)
+            solved, score = deltas.get(entry.user_id, (0, 0))
+            deltas[entry.user_id] = (solved + 1, score + entry.points)
+
+    db.session.execute(insert(Submission), [
+        dict(user_id=e.user_id, problem_id=e.problem_id, submitted_answer=e.submitted_answer,
+             result=e.result, timestamp=e.timestamp)
+        for e in entries
+    ])
+
+    if deltas:
+        users = User.__table__
+        db.session.execute(
+            users.update().where(users.c.id == bindparam('uid')).values(
+                solved_problems_count=func.coalesce(users.c.solved_problems_count, 0) + bindparam('solved'),
+                score=func.coalesce(users.c.score, 0) + bindparam('points'),
+            ),
+            [dict(uid=user_id, solved=solved, points=points) for user_id, (solved, points) in deltas.items()]
+        )
+        # Core updates fire no model events, so the leaderboard is invalidated explicitly
+        cache.invalidate_on_commit(db.session, 'leaderboard')
+
+    update_problem_stats(entries, new_solves)
+    update_topic_mastery(entries)
+
+    if log_name:
+        db.session.merge(SubmissionLogCheckpoint(log_name=log_name, last_seq=max(e.seq for e in entries)))
+    return new_solves
+
+
+class SubmissionWriteBehind:
+    """
+    Write-behind pipeline for problem submissions. Requests grade synchronously and call
+    `record()`, which appends the result to this worker's append-only log and returns at
+    once; a background thread commits the buffered rows in batches via apply_submissions().
+
+    Each batch stores the highest log sequence number it contains in the
+    submission_log_checkpoint table, in the same transaction. Logs left behind by a worker
+    that died are replayed from that checkpoint by `recover()` on the next startup, so
+    nothing is lost or applied twice.
+
+    Configuration keys:
+        SUBMISSION_WRITE_BEHIND   Buffer submissions (False writes each one in the request).
+        SUBMISSION_LOG_DIR        Directory for the per-worker logs (defaults to one per database URI,
+                                  so logs are only ever replayed into the database they belong to).
+        SUBMISSION_FLUSH_INTERVAL Seconds between background flushes.
+        SUBMISSION_FLUSH_BATCH    Entries per transaction; a full batch also triggers a flush.
+        SUBMISSION_LOG_FSYNC      fsync every append (survives power loss, costs latency).
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending = []
+        self._pid = None
+        self._log = None
+        self._log_name = None
+        self._seq = 0
+        self._thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SUBMISSION_WRITE_BEHIND', True)
+        database_uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+        app.config.setdefault('SUBMISSION_LOG_DIR', os.path.join(
+            app.instance_path, 'submission_log', hashlib.md5(database_uri.encode()).hexdigest()[:8]))
+        app.config.setdefault('SUBMISSION_FLUSH_INTERVAL', 0.5)
+        app.config.setdefault('SUBMISSION_FLUSH_BATCH', 500)
+        app.config.setdefault('SUBMISSION_LOG_FSYNC', False)
+        self.app = app
+        app.extensions['submission_buffer'] = self
+
+    @property
+    def enabled(self):
+        return bool(self.app.config['SUBMISSION_WRITE_BEHIND']) and fcntl is not None
+
+    # --- Request side ---
+    def record(self, user_id, problem_id, submitted_answer, result, points):
+        """Records a graded submission and returns it as a BufferedSubmission."""
+        entry = BufferedSubmission(0, user_id, problem_id, submitted_answer, result, points, datetime.utcnow())
+        if not self.enabled:
+            apply_submissions([entry])
+            db.session.commit()
+            return entry
+
+        self._ensure_started()
+        with self._lock:
+            self._seq += 1
+            entry = entry._replace(seq=self._seq)
+            self._log.write(_encode(entry) + '\n')
+            self._log.flush()
+            if self.app.config['SUBMISSION_LOG_FSYNC']:
+                os.fsync(self._log.fileno())
+            self._pending.append(entry)
+            if len(self._pending) >= self.app.config['SUBMISSION_FLUSH_BATCH']:
+                self._wake.set()
+        return entry
+
+    def pending_for(self, user_id, problem_id):
+        """Buffered submissions of one user for one problem that may not be committed yet."""
+        with self._lock:
+            return [e for e in self._pending if e.user_id == user_id and e.problem_id == problem_id]
+
+    # --- Background side ---
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # First use in this process (gunicorn forks workers): fresh log, lock and flusher
+            log_dir = self.app.config['SUBMISSION_LOG_DIR']
+            os.makedirs(log_dir, exist_ok=True)
+            self._log_name = f"submissions-{os.getpid()}-{uuid.uuid4().hex[:8]}.log"
+            self._log = open(os.path.join(log_dir, self._log_name), 'a', encoding='utf-8')
+            fcntl.flock(self._log.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            self._pending, self._seq = [], 0
+            self._thread = threading.Thread(target=self._run, name='submission-flusher', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+            atexit.register(self.flush_all)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.app.config['SUBMISSION_FLUSH_INTERVAL'])
+            self._wake.clear()
+            try:
+                while self.flush():
+                    pass
+            except Exception:
+                self.app.logger.exception('Submission flush failed; will retry')
+
+    def flush(self):
+        """Commits one batch of buffered submissions. Returns True if more are waiting."""
+        with self._flush_lock:
+            with self._lock:
+                batch = self._pending[:self.app.config['SUBMISSION_FLUSH_BATCH']]
+            if not batch:
+                return False
+            with self.app.app_context():
+                try:
+                    apply_submissions(batch, self._log_name)
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    raise
+            with self._lock:
+                del self._pending[:len(batch)]
+                if not self._pending:
+                    # Everything in the log is committed and checkpointed; reclaim the space
+                    self._log.seek(0)
+                    self._log.truncate()
+                return bool(self._pending)
+
+    def flush_all(self):
+        if self._pid != os.getpid():
+            return
+        try:
+            while self.flush():
+                pass
+        except Exception:
+            self.app.logger.exception('Could not flush buffered submissions at exit; they will be replayed')
+
+    # --- Recovery ---
+    def recover(self):
+        """Replays logs of dead workers. Call inside an app context after db.create_all()."""
+        if fcntl is None:
+            return 0
+        replayed = 0
+        batch_size = self.app.config['SUBMISSION_FLUSH_BATCH']
+        for path in sorted(glob.glob(os.path.join(self.app.config['SUBMISSION_LOG_DIR'], LOG_PATTERN))):
+            try:
+                log = open(path, 'r+', encoding='utf-8')
+            except FileNotFoundError:
+                continue # Replayed and removed by another worker since the glob
+            with log:
+                try:
+                    fcntl.flock(log.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    continue # Owned by a live worker
+                if not os.path.exists(path):
+                    continue # Another worker finished this log between our open and flock
+                log_name = os.path.basename(path)
+                checkpoint = db.session.get(SubmissionLogCheckpoint, log_name)
+                last_seq = checkpoint.last_seq if checkpoint else 0
+                entries = []
+                for line in log:
+                    try:
+                        entries.append(_decode(line))
+                    except (ValueError, TypeError, KeyError):
+                        break # A torn final line from the crash
+                entries = [e for e in entries if e.seq > last_seq]
+                for start in range(0, len(entries), batch_size):
+                    apply_submissions(entries[start:start + batch_size], log_name)
+                    db.session.commit()
+                replayed += len(entries)
+                # Empty the log, then drop its checkpoint, then the file, all under the lock: a crash
+                # in between leaves nothing to replay twice, and a worker that opened the file
+                # earlier finds it gone after its flock
+                log.seek(0)
+                log.truncate()
+                checkpoint = db.session.get(SubmissionLogCheckpoint, log_name)
+                if checkpoint:
+                    db.session.delete(checkpoint)
+                    db.session.commit()
+                os.remove(path)
+        if replayed:
+            current_app.logger.info('Replayed %d buffered submissions from earlier workers', replayed)
+        return replayed
+
+
+submission_buffer = SubmissionWriteBehind()
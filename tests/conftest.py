@@ -0,0 +1,23 @@
+import pytest
+
+from app import create_app
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Builds apps whose database, cache file and submission logs all live in tmp_path."""
+    def make(**config):
+        return create_app({
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "app.sqlite3"}',
+            'CACHE_SQLITE_PATH': str(tmp_path / 'cache.sqlite3'),
+            'SUBMISSION_LOG_DIR': str(tmp_path / 'submission_log'),
+            'SUBMISSION_FLUSH_INTERVAL': 3600, # Tests flush by hand
+            'PASSWORD_HASH_WORKERS': 0,
+            **config,
+        })
+    return make
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from sqlalchemy import delete
+
+from extensions import db
+from models import User, Problem, Submission, Quiz, QuizAttempt, ProblemStats, PerformanceRollup, TopicMastery
+
+
+def _count(model):
+    return db.session.query(model).count()
+
+
+def test_empty_aggregate_tables_are_backfilled_at_startup(make_app):
+    app = make_app()
+    with app.app_context():
+        user = User(username='student', email='student@example.com', password='x')
+        quiz = Quiz(title='Algebra', topic='Algebra', class_level='10')
+        db.session.add_all([user, quiz])
+        db.session.flush()
+        problem_id = db.session.execute(db.select(Problem.id)).scalars().first()
+        # Plain inserts, as an older version of the app wrote them: no aggregates
+        db.session.add_all([
+            Submission(user_id=user.id, problem_id=problem_id, submitted_answer='1', result='Accepted',
+                       timestamp=datetime.utcnow()),
+            QuizAttempt(user_id=user.id, quiz_id=quiz.id, score=7, total_questions=10, passed=True),
+        ])
+        db.session.commit()
+        for model in (ProblemStats, PerformanceRollup, TopicMastery):
+            db.session.execute(delete(model))
+        db.session.commit()
+
+    app = make_app(RELOAD_PROBLEMS_ON_STARTUP=False)
+    with app.app_context():
+        stats = db.session.get(ProblemStats, problem_id)
+        assert (stats.attempt_count, stats.accepted_count, stats.solver_count) == (1, 1, 1)
+        assert _count(PerformanceRollup) == 1
+        assert _count(TopicMastery) == 1
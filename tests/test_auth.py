@@ -0,0 +1,26 @@
+from extensions import db
+from models import User
+
+
+def test_admin_usernames_cannot_be_registered(make_app):
+    app = make_app(ADMIN_USERNAMES=['teacher'], WTF_CSRF_ENABLED=False)
+    response = app.test_client().post('/register', data={
+        'username': 'teacher', 'email': 'someone@example.com', 'password': 'secret'})
+    assert b'reserved' in response.data
+    with app.app_context():
+        assert User.query.filter_by(username='teacher').first() is None
+
+
+def test_create_admin_command(make_app):
+    app = make_app(ADMIN_USERNAMES=['teacher'])
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['create-admin', 'student', 'student@example.com', '--password', 'pw'])
+    assert result.exit_code != 0
+    result = runner.invoke(args=['create-admin', 'teacher', 'teacher@example.com', '--password', 'pw'])
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        teacher = User.query.filter_by(username='teacher').one()
+        assert teacher.password != 'pw'
+    client = app.test_client()
+    client.post('/login', data={'username': 'teacher', 'password': 'pw'})
+    assert client.get('/analytics').status_code == 200
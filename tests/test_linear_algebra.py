@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+from linear_algebra import compute_batch, LinearAlgebraError
+
+
+def test_exact_power_too_large_is_a_per_matrix_error():
+    results = compute_batch('power', [[[999999999, 2], [3, 4]], [[1, 1], [1, 0]]], exponent=1000, exact=True)
+    assert 'error' in results[0]
+    assert 'result' in results[1]
+    json.dumps(results)
+
+
+def test_exact_negative_power():
+    assert compute_batch('power', [[[2, 1], [1, 1]]], exponent=-3, exact=True) == [{'result': [[5, -8], [-8, 13]]}]
+
+
+def test_numeric_overflow_is_a_per_matrix_error():
+    results = compute_batch('power', [[[1e10, 2], [3, 4]], [[1, 2], [3, 4]]], exponent=1000)
+    assert 'error' in results[0]
+    results = compute_batch('determinant', [[[1e300, 0], [0, 1e300]], [[1, 2], [3, 4]]])
+    assert 'error' in results[0]
+    assert results[1] == {'determinant': -2.0}
+    json.dumps(results, allow_nan=False)
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'operation': 'determinant', 'matrices': [[[10 ** 400, 0], [0, 1]]]},
+    {'operation': 'solve', 'matrices': [[[1, 0], [0, 1]]], 'rhs': [[10 ** 400, 1]]},
+    {'operation': 'power', 'matrices': [[[1, 0], [0, 1]]], 'exponent': float('inf')},
+])
+def test_huge_numbers_are_rejected(kwargs):
+    with pytest.raises(LinearAlgebraError):
+        compute_batch(**kwargs)
@@ -0,0 +1,49 @@
+import json
+
+import numpy as np
+import pytest
+
+from polynomial import solve_batch, PolynomialError, MAX_DEGREE
+
+
+def test_double_root_next_to_a_close_simple_root():
+    # 1, 1 and 1.2 used to be merged into one cluster that failed the check, so the
+    # double root at 1 came back as a pair of complex roots
+    result = solve_batch([list(np.poly([1, 1, 1.2, 3, 4, 5, 6, 7, 8, 9]))])[0]
+    assert result['real_root_count'] == 10
+    assert result['has_repeated_roots']
+    multiplicities = {round(root['real'], 6): root['multiplicity'] for root in result['roots']}
+    assert multiplicities[1.0] == 2
+    assert multiplicities[1.2] == 1
+
+
+def test_repeated_complex_pair():
+    result = solve_batch([list(np.real(np.poly([1 + 1j, 1 - 1j, 1 + 1j, 1 - 1j])))])[0]
+    assert result['complex_root_count'] == 4
+    assert [root['multiplicity'] for root in result['roots']] == [2, 2]
+
+
+def test_huge_coefficients_are_scaled():
+    result = solve_batch([[1e200, 1e200, 1]])[0]
+    assert result['real_root_count'] == 2
+    assert result['roots'][0]['real'] == pytest.approx(-1.0)
+    json.dumps(result, allow_nan=False)
+
+
+@pytest.mark.parametrize('coefficients', [[1e-310, 1], [1e-310, 1e300, 1], [1e-310, 1, 1, 1]])
+def test_roots_too_large_are_a_per_polynomial_error(coefficients):
+    results = solve_batch([coefficients, [1, -3, 2]])
+    assert 'error' in results[0]
+    assert results[1]['real_root_count'] == 2
+    json.dumps(results, allow_nan=False)
+
+
+@pytest.mark.parametrize('polynomials', [
+    [[10 ** 400, 1]],
+    [[1, float('nan')]],
+    [[1] * (MAX_DEGREE + 2)],
+    [[1] * (MAX_DEGREE + 1)] * 5000,
+])
+def test_invalid_batches_are_rejected(polynomials):
+    with pytest.raises(PolynomialError):
+        solve_batch(polynomials)
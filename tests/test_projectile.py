@@ -0,0 +1,66 @@
+import math
+
+import pytest
+
+from projectile import compute_batch, ProjectileError
+
+
+def _reference_flight(velocity, angle, height, g, drag, dt=1e-3):
+    """
+    Scalar RK4 integration with a fine step (shortened so drag*|v|*dt stays below 0.01);
+    returns (time_of_flight, range).
+    """
+    theta = math.radians(angle)
+    state = (0.0, height, velocity * math.cos(theta), velocity * math.sin(theta))
+
+    def derivative(state):
+        _, _, vx, vy = state
+        speed = math.hypot(vx, vy)
+        return (vx, vy, -drag * speed * vx, -g - drag * speed * vy)
+
+    t = 0.0
+    while True:
+        h = min(dt, 0.01 / (drag * math.hypot(state[2], state[3]) + 1e-300))
+        k1 = derivative(state)
+        k2 = derivative([s + 0.5 * h * k for s, k in zip(state, k1)])
+        k3 = derivative([s + 0.5 * h * k for s, k in zip(state, k2)])
+        k4 = derivative([s + h * k for s, k in zip(state, k3)])
+        new = tuple(s + h / 6 * (a + 2 * b + 2 * c + d) for s, a, b, c, d in zip(state, k1, k2, k3, k4))
+        if new[1] < 0:
+            fraction = state[1] / (state[1] - new[1])
+            return t + fraction * h, state[0] + fraction * (new[0] - state[0])
+        state, t = new, t + h
+
+
+@pytest.mark.parametrize('params', [
+    {'velocity': 10, 'angle': 0, 'height': 100, 'drag': 0.05}, # drag-limited fall from a height
+    {'velocity': 30, 'angle': -60, 'height': 50, 'drag': 0.2}, # steep descent
+    {'velocity': 40, 'angle': 45, 'height': 0, 'drag': 0.01},
+    {'velocity': 0, 'angle': 0, 'height': 20, 'drag': 1.0}, # dropped from rest
+    # High drag: drag*|v| is large at launch, where a fixed step would diverge
+    {'velocity': 99.26, 'angle': 64.8, 'height': 120.9, 'drag': 0.333},
+    {'velocity': 72.43, 'angle': 38, 'height': 936.4, 'drag': 0.423},
+    {'velocity': 50.05, 'angle': -9.1, 'height': 651.6, 'drag': 0.789},
+    {'velocity': 1e6, 'angle': 30, 'height': 0, 'drag': 0.001},
+])
+def test_drag_matches_fine_reference(params):
+    result = compute_batch([params], samples=20)[0]
+    expected_time, expected_range = _reference_flight(params['velocity'], params['angle'], params['height'], 9.8, params['drag'])
+    assert result['time_of_flight'] == pytest.approx(expected_time, rel=2e-3, abs=1e-3)
+    assert result['range'] == pytest.approx(expected_range, rel=2e-3, abs=1e-3)
+    # The sampled path ends on the ground
+    assert result['path']['y'][-1] == pytest.approx(0.0, abs=0.05)
+
+
+def test_non_finite_results_are_rejected():
+    with pytest.raises(ProjectileError):
+        compute_batch([{'velocity': 1, 'angle': 0}, {'velocity': 1e200, 'angle': 45}])
+
+
+@pytest.mark.parametrize('items, samples', [
+    ([{'velocity': 10 ** 400, 'angle': 45}], 50),
+    ([{'velocity': 10, 'angle': 45}], float('inf')),
+])
+def test_numbers_too_large_for_a_float_are_rejected(items, samples):
+    with pytest.raises(ProjectileError):
+        compute_batch(items, samples=samples)
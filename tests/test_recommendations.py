@@ -0,0 +1,29 @@
+from datetime import datetime
+
+import recommendations
+from extensions import db
+from models import User, Problem
+from submission_buffer import BufferedSubmission, apply_submissions
+
+
+def test_wrong_answers_refresh_cached_recommendations(app, monkeypatch):
+    with app.app_context():
+        user = User(username='student', email='student@example.com', password='x')
+        db.session.add(user)
+        db.session.commit()
+        problem = db.session.execute(db.select(Problem)).scalars().first()
+
+        scored = []
+        real_score = recommendations.score_problems
+        monkeypatch.setattr(recommendations, 'score_problems',
+                            lambda *args: scored.append(1) or real_score(*args))
+
+        first = recommendations.recommend_for(user)
+        assert recommendations.recommend_for(user) == first
+        assert len(scored) == 1
+
+        # A wrong answer leaves solved_problems_count alone but changes the topic mastery
+        apply_submissions([BufferedSubmission(0, user.id, problem.id, '0', 'Wrong Answer', 10, datetime.utcnow())])
+        db.session.commit()
+        recommendations.recommend_for(user)
+        assert len(scored) == 2
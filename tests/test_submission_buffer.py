@@ -0,0 +1,105 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+import pytest
+
+import submission_buffer as buffer_module
+from extensions import db
+from models import User, Problem, Submission, SubmissionLogCheckpoint
+from submission_buffer import SubmissionWriteBehind, BufferedSubmission, apply_submissions
+
+
+@pytest.fixture
+def ids(app):
+    """(user id, problem id) of a fresh user and the first problem."""
+    with app.app_context():
+        user = User(username='student', email='student@example.com', password='x')
+        db.session.add(user)
+        db.session.commit()
+        return user.id, db.session.execute(db.select(Problem.id)).scalars().first()
+
+
+def _scores(user_id):
+    user = db.session.get(User, user_id)
+    db.session.refresh(user)
+    return user.solved_problems_count, user.score
+
+
+def _entry(seq, user_id, problem_id, result='Accepted'):
+    return BufferedSubmission(seq, user_id, problem_id, '42', result, 10, datetime.utcnow())
+
+
+def test_flush_commits_and_credits_first_solve_once(app, ids):
+    user_id, problem_id = ids
+    buffer = SubmissionWriteBehind(app)
+    with app.app_context():
+        for result in ('Wrong Answer', 'Accepted', 'Accepted'):
+            buffer.record(user_id, problem_id, '42', result, 10)
+        assert len(buffer.pending_for(user_id, problem_id)) == 3
+        while buffer.flush():
+            pass
+        buffer.record(user_id, problem_id, '42', 'Accepted', 10)
+        buffer.flush()
+
+        assert db.session.query(Submission).filter_by(user_id=user_id).count() == 4
+        assert _scores(user_id) == (1, 10)
+        assert buffer.pending_for(user_id, problem_id) == []
+        # Everything is committed, so the log has been emptied
+        assert os.path.getsize(os.path.join(app.config['SUBMISSION_LOG_DIR'], buffer._log_name)) == 0
+
+
+def test_recover_replays_entries_after_the_checkpoint(app, ids):
+    user_id, problem_id = ids
+    log_dir = app.config['SUBMISSION_LOG_DIR']
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'submissions-1-dead.log')
+    with open(log_path, 'w', encoding='utf-8') as log:
+        for seq, result in enumerate(('Wrong Answer', 'Wrong Answer', 'Accepted'), start=1):
+            log.write(buffer_module._encode(_entry(seq, user_id, problem_id, result)) + '\n')
+        log.write('{"seq": 4, "user_') # Torn by the crash
+
+    buffer = SubmissionWriteBehind(app)
+    with app.app_context():
+        # The dead worker had committed its first entry
+        apply_submissions([_entry(1, user_id, problem_id, 'Wrong Answer')], 'submissions-1-dead.log')
+        db.session.commit()
+
+        assert buffer.recover() == 2
+        assert db.session.query(Submission).filter_by(user_id=user_id).count() == 3
+        assert _scores(user_id) == (1, 10)
+        assert not os.path.exists(log_path)
+        assert db.session.get(SubmissionLogCheckpoint, 'submissions-1-dead.log') is None
+        assert buffer.recover() == 0
+
+
+def test_concurrent_batches_credit_a_solve_once(app, ids, monkeypatch):
+    user_id, problem_id = ids
+    arrived = [threading.Event(), threading.Event()]
+    real_insert = buffer_module.insert
+
+    def slow_insert(table):
+        # Hold each batch between its first-solve check and its writes until the other batch
+        # gets there too (or can't, because it is waiting for the write lock)
+        me = int(threading.current_thread().name)
+        arrived[me].set()
+        arrived[1 - me].wait(1)
+        return real_insert(table)
+
+    monkeypatch.setattr(buffer_module, 'insert', slow_insert)
+
+    def submit():
+        with app.app_context():
+            apply_submissions([_entry(1, user_id, problem_id)])
+            db.session.commit()
+
+    threads = [threading.Thread(target=submit, name=str(i)) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        assert db.session.query(Submission).filter_by(user_id=user_id).count() == 2
+        assert _scores(user_id) == (1, 10)